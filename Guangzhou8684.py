@@ -1,6 +1,49 @@
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from page_cache import PageCache
 import requests
+import collections
+import json
+import os
+import queue
 import random
+import re
+import threading
+import time
+
+# 抓取配置：MAX_WORKERS 为每个站点（域名）同时进行的最大请求数，设为1即为逐条顺序抓取；
+# REQUEST_DELAY 为同一站点两次请求之间的最小间隔（秒），避免请求过快被封
+MAX_WORKERS = 8
+REQUEST_DELAY = 0.1
+REQUEST_TIMEOUT = 30
+
+# 输出文件；RECORD_FILE 为结构化记录（每条线路一行 JSON），可直接由 txtToxlxs.py 读取；
+# JOURNAL_FILE 记录已写入的线路，中断后重新运行会从断点继续（抓取完成后删除）
+OUTPUT_FILE = 'bus.txt'
+RECORD_FILE = 'bus.jsonl'
+ERROR_FILE = 'error.txt'
+JOURNAL_FILE = 'bus_journal.log'
+# 写入线程每批最多处理的线路数，每批写完后统一刷新文件并记入日志
+WRITE_BATCH = 64
+
+# 网页缓存目录（设为 None 则不缓存）；缓存存在时使用条件请求，未变化的网页不再重新下载。
+# ONLY_CHANGED 为 True 时，内容未变化的线路直接复用上次的解析结果
+CACHE_DIR = 'page_cache'
+ONLY_CHANGED = True
+
+# 网页解析方式：'html.parser'（BeautifulSoup，无需额外依赖）、'lxml' 或 'selectolax'，
+# 后两者只提取需要的节点，速度更快，解析结果与 'html.parser' 一致（可用 bench_parser.py 对比）
+PARSER = 'html.parser'
+
+# 8684 各城市网址，{city} 为城市拼音
+BASE_URL = 'https://{city}.8684.cn'
+
+# 城市首页找不到线路分类时使用的默认首字母（广州）
+BUS_HEAD = ['1', '2', '3', '4', '5', '6', '7', '8', '9',
+            'A', 'B', 'C', 'D', 'F', 'G', 'H', 'K', 'L',
+            'N', 'S', 'T', 'X', 'Y', 'Z']
 
 # UA池
 def get_headers(referer_url):
@@ -23,78 +66,488 @@ def get_headers(referer_url):
     return headers
 
 
-def main():
-    base_url = 'https://guangzhou.8684.cn'  # 广州公交网的URL
+class HostLimiter:
+    """按域名限制同时进行的请求数，并保证同一域名相邻两次请求至少间隔 delay 秒"""
 
-    # 公交线路头字母支持扩展
-    bus_head = ['1', '2', '3', '4', '5', '6', '7', '8', '9',
-                'A', 'B', 'C', 'D', 'F', 'G', 'H', 'K', 'L',
-                'N', 'S', 'T', 'X', 'Y', 'Z']
+    def __init__(self, max_concurrency=MAX_WORKERS, delay=REQUEST_DELAY):
+        self.max_concurrency = max(1, max_concurrency)
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_time = {}
 
-    for bus in bus_head:
-        bus_single_url = f"{base_url}/list{bus}"  # 构造公交线路分类的URL
+    @contextmanager
+    def slot(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.Semaphore(self.max_concurrency))
+        with semaphore:
+            # 预约下一次可以发起请求的时间点，超前的线程在这里等待
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_time.get(host, now))
+                self._next_time[host] = start + self.delay
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+
+# 每个线程复用自己的连接池
+_local = threading.local()
+
+def get_session():
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def fetch(url, referer_url, limiter, cache=None):
+    """
+    请求页面，返回 (HTML 文本, 内容摘要)，每次请求都重新生成 UA。
+    传入 cache 时发送条件请求，未变化的网页从缓存读取；不使用缓存时内容摘要为 None。
+    """
+    headers = get_headers(referer_url)
+    if cache is not None:
+        headers.update(cache.conditional_headers(url))
+    with limiter.slot(url):
+        resp = get_session().get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    if cache is not None and resp.status_code == 304:
+        return cache.load(url)
+    resp.raise_for_status()  # 检查请求是否成功
+    if cache is None:
+        return resp.text, None
+    return resp.text, cache.store(url, resp.text, resp.headers.get('ETag'), resp.headers.get('Last-Modified'))
+
+
+# ------------------- 网页解析 -------------------
+# 各解析方式只负责提取 info、bus-excerpt mb15、bus-lzlist mb15 中的文字，
+# 之后的整理由 parse_route_page 统一完成
+
+def _extract_bs4(html):
+    bus_detail_html = BeautifulSoup(html, 'html.parser')
+    bus_info = bus_detail_html.find('div', class_="info")
+    info_text = bus_info.get_text('#')
+    route_total = bus_detail_html.find_all('div', 'bus-excerpt mb15')
+    bus_lzlist = bus_detail_html.find_all('div', 'bus-lzlist mb15')
+    trips = []
+    for route, bus_ls in zip(route_total, bus_lzlist):
+        trips.append((route.find('div', 'trip').get_text(), [li.get_text() for li in bus_ls.find_all('a')]))
+    return info_text, trips
+
+
+def _list_bs4(html):
+    bus_main_html = BeautifulSoup(html, 'html.parser')
+    bus_route_list = bus_main_html.find('div', class_="list clearfix").find_all('a')
+    return [route.get('href') for route in bus_route_list]
+
+
+# 与 BeautifulSoup 的 class_ 匹配规则一致：含空格时匹配完整的 class 属性，否则匹配其中一个类名
+_XPATH_INFO = "//div[contains(concat(' ', normalize-space(@class), ' '), ' info ')]"
+_XPATH_EXCERPT = "//div[normalize-space(@class)='bus-excerpt mb15']"
+_XPATH_LZLIST = "//div[normalize-space(@class)='bus-lzlist mb15']"
+_XPATH_TRIP = ".//div[contains(concat(' ', normalize-space(@class), ' '), ' trip ')]"
+_XPATH_LIST = "//div[normalize-space(@class)='list clearfix']"
+# BeautifulSoup 的 get_text 不包含注释以及 script、style、template 中的文字
+_SKIP_TEXT_TAGS = ('script', 'style', 'template')
+
+
+def _lxml_strings(element):
+    if element.text and element.tag not in _SKIP_TEXT_TAGS:
+        yield element.text
+    for child in element:
+        if isinstance(child.tag, str):  # 注释等节点的 tag 不是字符串
+            yield from _lxml_strings(child)
+        if child.tail:
+            yield child.tail
+
+
+def _extract_lxml(html):
+    import lxml.html
+    doc = lxml.html.fromstring(html)
+    info_text = '#'.join(_lxml_strings(doc.xpath(_XPATH_INFO)[0]))
+    trips = []
+    for route, bus_ls in zip(doc.xpath(_XPATH_EXCERPT), doc.xpath(_XPATH_LZLIST)):
+        trip = ''.join(_lxml_strings(route.xpath(_XPATH_TRIP)[0]))
+        trips.append((trip, [''.join(_lxml_strings(li)) for li in bus_ls.iterdescendants('a')]))
+    return info_text, trips
+
+
+def _list_lxml(html):
+    import lxml.html
+    doc = lxml.html.fromstring(html)
+    return [a.get('href') for a in doc.xpath(_XPATH_LIST)[0].iterdescendants('a')]
+
+
+def _selectolax_text(node, separator=''):
+    if node.css_first(', '.join(_SKIP_TEXT_TAGS)) is None:
+        return node.text(separator=separator)
+    return separator.join(n.text_content for n in node.traverse(include_text=True)
+                          if n.tag == '-text' and n.parent.tag not in _SKIP_TEXT_TAGS)
+
+
+def _extract_selectolax(html):
+    from selectolax.lexbor import LexborHTMLParser
+    doc = LexborHTMLParser(html)
+    info_text = _selectolax_text(doc.css('div.info')[0], '#')
+    trips = []
+    for route, bus_ls in zip(doc.css('div[class="bus-excerpt mb15"]'), doc.css('div[class="bus-lzlist mb15"]')):
+        trip = _selectolax_text(route.css('div.trip')[0])
+        trips.append((trip, [_selectolax_text(li) for li in bus_ls.css('a')]))
+    return info_text, trips
+
+
+def _list_selectolax(html):
+    from selectolax.lexbor import LexborHTMLParser
+    return [a.attributes.get('href') for a in LexborHTMLParser(html).css('div[class="list clearfix"]')[0].css('a')]
+
+
+ROUTE_EXTRACTORS = {'html.parser': _extract_bs4, 'lxml': _extract_lxml, 'selectolax': _extract_selectolax}
+LIST_EXTRACTORS = {'html.parser': _list_bs4, 'lxml': _list_lxml, 'selectolax': _list_selectolax}
+
+
+def parse_route_list(html, parser=PARSER):
+    """解析线路分类页面，返回线路详细页面的相对链接"""
+    return LIST_EXTRACTORS[parser](html)
+
+
+def parse_route_page(html, parser=PARSER):
+    """
+    解析线路详细页面，返回：
+    detail：线路基本信息（前6条），company_name：公司名称，
+    trips：[(方向, [依次经过的站点]), ...]
+    """
+    info_text, raw_trips = ROUTE_EXTRACTORS[parser](html)
+
+    # 提取线路基本信息
+    detail = info_text.split('#')[:6]
+    company_name = detail[-2] + detail[-1]  # 公司名称拼接
+
+    trips = []
+    for trip, li_list in raw_trips:
+        start, end = trip.split('—')  # 获取起始站点和终点站的名字
+        # 过滤掉重复的首尾站点
+        tmp = [li for idx, li in enumerate(li_list[1:-1]) if li != start and li != end]
+        tmp = [li_list[0]] + tmp + [li_list[-1]]
+        trips.append((trip, tmp))
+
+    return {'detail': detail, 'company_name': company_name, 'trips': trips}
+
+
+def format_route_block(route_url, record):
+    """把解析结果整理成写入 bus.txt 的文本块"""
+    lines = [f"=== {route_url} 的信息 ===\n",
+             '\n'.join(record['detail'][:4]),  # 写入前4条基本信息
+             '\n' + "公司名称：" + record['company_name'] + '\n']
+    for trip, stations in record['trips']:
+        # 添加站点编号
+        tmp = [f'{idx + 1}:{r}' for idx, r in enumerate(stations)]
+        lines.append('\n' + trip + '\n')
+        lines.append(' -> '.join(tmp) + '\n')
+    return ''.join(lines)
+
+
+def build_route_record(route_url, record):
+    """
+    整理成结构化记录：route 为线路名称，company 为运营公司，time 为运行时间原文，
+    directions 依次为各个方向的起止站（trip）与途经站点（stations）
+    """
+    detail = record['detail']
+    time_str = next((d.strip()[len('运行时间：'):] for d in detail[:4] if d.strip().startswith('运行时间：')), '')
+    company = record['company_name'].split('公交公司：')[-1]
+    return {
+        'url': route_url,
+        'route': detail[0].strip(),
+        'info': detail[:4],
+        'company': company.strip(),
+        'time': time_str.strip(),
+        'directions': [{'trip': trip, 'stations': list(stations)} for trip, stations in record['trips']]
+    }
 
+
+def crawl_route(route_url, referer_url, limiter, cache=None, only_changed=ONLY_CHANGED, parser=PARSER):
+    """抓取并解析单条线路，返回 (route_url, 解析结果, 错误信息)，二者必有一个为 None"""
+    try:
+        html, digest = fetch(route_url, referer_url, limiter, cache)
+    except Exception as e:
+        return route_url, None, f"请求错误：{route_url} - {str(e)}"
+    try:
+        record = cache.load_parsed(digest) if cache is not None and only_changed else None
+        if record is None:
+            record = parse_route_page(html, parser)
+            if cache is not None:
+                cache.store_parsed(digest, record)
+        return route_url, record, None
+    except Exception as e:
+        # 如果发生解析错误，记录错误信息
+        return route_url, None, f"解析错误：{route_url} - {str(e)}"
+
+
+def write_error(message, path=ERROR_FILE):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(message + '\n')
+
+
+class CrawlJournal:
+    """
+    已完成线路的追加式日志，每行为“写入该线路后各输出文件的字节数（以\t分隔）\t线路URL”。
+    线路先写入 bus.txt 和 bus.jsonl，再追加日志；若程序在两者之间中断，
+    恢复时会把输出文件截断到最后一条日志记录的位置，保证不出现残缺或重复的线路。
+    """
+
+    def __init__(self, path=JOURNAL_FILE, outputs=(OUTPUT_FILE, RECORD_FILE)):
+        self.path = path
+        self.outputs = list(outputs)
+        self.done = set()
+        self.offsets = [0] * len(self.outputs)
+        self._file = None
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    *offsets, route_url = line.rstrip('\n').split('\t')
+                    try:
+                        offsets = [int(offset) for offset in offsets]
+                    except ValueError:
+                        continue
+                    if len(offsets) != len(self.outputs):
+                        continue  # 中断时写了一半的行
+                    self.done.add(route_url)
+                    self.offsets = offsets
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def restore(self):
+        """丢弃输出文件中最后一条日志记录之后的内容"""
+        for output_path, offset in zip(self.outputs, self.offsets):
+            with open(output_path, 'a+b') as f:
+                f.truncate(offset)
+
+    def record(self, route_url, offsets):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        self._file.write('\t'.join(str(offset) for offset in offsets) + f"\t{route_url}\n")
+        self.done.add(route_url)
+        self.offsets = list(offsets)
+
+    def flush(self):
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def clear(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.done = set()
+        self.offsets = [0] * len(self.outputs)
+
+
+class RouteWriter:
+    """
+    单独的写入线程：在抓取期间一直打开 bus.txt、bus.jsonl、error.txt 和日志，从队列中成批取出线路写入。
+    每条线路的内容一次写完，多个抓取线程同时提交时也不会相互穿插；
+    每批写完并刷新输出文件后才记入日志，中断时日志不会记录尚未写入文件的线路。
+    """
+
+    def __init__(self, journal, error_file=ERROR_FILE, batch_size=WRITE_BATCH):
+        self.journal = journal
+        self.batch_size = batch_size
+        self.written = 0
+        self.failed = 0
+        self._queue = queue.Queue()
+        self._outputs = [open(path, 'ab') for path in journal.outputs]
+        self._errors = open(error_file, 'a', encoding='utf-8')
+        self._exception = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write_route(self, route_url, contents):
+        """contents 依次为写入各输出文件（bus.txt、bus.jsonl）的文本"""
+        self._queue.put(('route', route_url, contents))
+
+    def write_error(self, message):
+        self._queue.put(('error', message))
+
+    def close(self):
+        """等待队列中的内容全部写入后关闭文件"""
+        self._queue.put(None)
+        self._thread.join()
+        for f in self._outputs:
+            f.close()
+        self._errors.close()
+        self.journal.close()
+        if self._exception is not None:
+            raise self._exception
+
+    def _run(self):
         try:
-            # 获取公交线路分类页面
-            resp = requests.get(bus_single_url, headers=get_headers(base_url))
-            resp.raise_for_status()  # 检查请求是否成功
-
-            # 解析线路分类页面
-            bus_main_html = BeautifulSoup(resp.text, 'html.parser')
-            bus_route_list = bus_main_html.find('div', class_="list clearfix").find_all('a')
-            route_hrefs = [route.get('href') for route in bus_route_list]
-
-            # 遍历每个公交线路的详细信息
-            for href in route_hrefs:
-                route_url = f"{base_url}{href}"  # 构造公交线路详细页面的URL
-
-                # 获取公交线路详细页面
-                bus_detail = requests.get(route_url, headers=get_headers(bus_single_url))
-                bus_detail.raise_for_status()  # 检查请求是否成功
-
-                # 解析线路详细页面
-                bus_detail_html = BeautifulSoup(bus_detail.text, 'html.parser')
-
-                try:
-                    bus_info = bus_detail_html.find('div', class_="info")
-                    # 提取线路基本信息
-                    detail = bus_info.get_text('#').split('#')[:6]
-                    company_name = detail[-2] + detail[-1]  # 公司名称拼接
-                    route_total = bus_detail_html.find_all('div', 'bus-excerpt mb15')
-                    bus_lzlist = bus_detail_html.find_all('div', 'bus-lzlist mb15')
-
-                    # 保存基本信息到文件
-                    with open('bus.txt', 'a', encoding='utf-8') as f:
-                        f.write(f"=== {route_url} 的信息 ===\n")
-                        f.write('\n'.join(detail[:4]))  # 写入前4条基本信息
-                        f.write('\n' + "公司名称：" + company_name + '\n')
-
-                    # 保存站点信息
-                    for route, bus_ls in zip(route_total, bus_lzlist):
-                        trip = route.find('div', 'trip').get_text()
-                        start, end = trip.split('—')  # 获取起始站点和终点站的名字
-                        li_list = [li.get_text() for li in bus_ls.find_all('a')]  # 获取经过站点
-                        # 过滤掉重复的首尾站点
-                        tmp = [li for idx, li in enumerate(li_list[1:-1]) if li != start and li != end]
-                        tmp = [li_list[0]] + tmp + [li_list[-1]]
-                        # 添加站点编号
-                        tmp = [f'{idx + 1}:{r}' for idx, r in enumerate(tmp)]
-
-                        with open('bus.txt', 'a', encoding='utf-8') as f:
-                            f.write('\n' + trip + '\n')
-                            f.write(' -> '.join(tmp) + '\n')
+            stop = False
+            while not stop:
+                items = [self._queue.get()]
+                while len(items) < self.batch_size:
+                    try:
+                        items.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                done = []
+                for item in items:
+                    if item is None:
+                        stop = True
+                    elif item[0] == 'error':
+                        self._errors.write(item[1] + '\n')
+                        self.failed += 1
+                    else:
+                        _, route_url, contents = item
+                        offsets = []
+                        for f, content in zip(self._outputs, contents):
+                            f.write(content.encode('utf-8'))
+                            offsets.append(f.tell())
+                        done.append((route_url, offsets))
+
+                for f in self._outputs:
+                    f.flush()
+                self._errors.flush()
+                for route_url, offsets in done:
+                    self.journal.record(route_url, offsets)
                     print(f"{route_url} 的信息写入成功！")
+                self.journal.flush()
+                self.written += len(done)
+        except Exception as e:
+            self._exception = e
+
 
-                except Exception as e:
-                    # 如果发生解析错误，记录错误信息
-                    with open('error.txt', 'a', encoding='utf-8') as f:
-                        f.write(f"解析错误：{route_url} - {str(e)}\n")
+def discover_bus_head(base_url, limiter, cache=None):
+    """从城市首页的“以数字/字母开头”索引中获取线路分类（/list1、/listA 等）"""
+    html, _ = fetch(f"{base_url}/", base_url, limiter, cache)
+    bus_head = []
+    for head in re.findall(r'href=["\'](?:{}|)/list(\w+)["\']'.format(re.escape(base_url)), html):
+        if head not in bus_head:
+            bus_head.append(head)
+    return bus_head
 
+
+def iter_route_urls(base_url, bus_head, limiter, cache=None, parser=PARSER, on_error=write_error):
+    """依次请求各线路分类页面，产出 (线路详细页面URL, 分类页面URL)"""
+    for bus in bus_head:
+        bus_single_url = f"{base_url}/list{bus}"  # 构造公交线路分类的URL
+
+        try:
+            route_hrefs = parse_route_list(fetch(bus_single_url, base_url, limiter, cache)[0], parser)
         except Exception as e:
             # 如果请求线路分类页面失败，记录错误信息
-            with open('error.txt', 'a', encoding='utf-8') as f:
-                f.write(f"请求错误：{bus_single_url} - {str(e)}\n")
+            on_error(f"请求错误：{bus_single_url} - {str(e)}")
+            continue
+
+        for href in route_hrefs:
+            yield f"{base_url}{href}", bus_single_url
+
+
+def skip_seen(tasks, seen):
+    """跳过已写入的线路以及在多个分类页面中重复出现的线路"""
+    for route_url, referer_url in tasks:
+        if route_url in seen:
+            continue
+        seen.add(route_url)
+        yield route_url, referer_url
+
+
+def ordered_map(executor, func, iterable, window):
+    """
+    与 executor.map 相同，按提交顺序返回结果，但同时最多提交 window 个任务，iterable 也按需逐个读取。
+    中断时只需等待已提交的少量任务，不必等整个城市抓取完毕
+    """
+    pending = collections.deque()
+    for item in iterable:
+        pending.append(executor.submit(func, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def crawl_city(city, out_dir='.', base_url=None, bus_head=None,
+               max_workers=MAX_WORKERS, delay=REQUEST_DELAY, resume=True,
+               cache_dir=CACHE_DIR, only_changed=ONLY_CHANGED, parser=PARSER):
+    """
+    抓取一个城市的全部线路，输出文件（bus.txt、bus.jsonl、error.txt、日志及网页缓存）保存在 out_dir 中。
+    city 为 8684 的城市拼音（如 guangzhou），bus_head 为 None 时从城市首页获取线路分类。
+    返回 (写入的线路数, 失败的线路数)
+    """
+    base_url = base_url or BASE_URL.format(city=city)
+    os.makedirs(out_dir, exist_ok=True)
+
+    journal = CrawlJournal(os.path.join(out_dir, JOURNAL_FILE),
+                           [os.path.join(out_dir, OUTPUT_FILE), os.path.join(out_dir, RECORD_FILE)])
+    if resume and journal.exists():
+        print(f"{city}：已完成 {len(journal.done)} 条线路，从断点继续抓取")
+    else:
+        # 没有日志时重新开始，清空上一次的输出
+        journal.clear()
+    journal.restore()
+
+    cache = PageCache(os.path.join(out_dir, cache_dir)) if cache_dir else None
+    limiter = HostLimiter(max_workers, delay)
+    writer = RouteWriter(journal, os.path.join(out_dir, ERROR_FILE))
+
+    if bus_head is None:
+        try:
+            bus_head = discover_bus_head(base_url, limiter, cache)
+        except Exception as e:
+            writer.write_error(f"请求错误：{base_url}/ - {str(e)}")
+            bus_head = []
+        if not bus_head:
+            print(f"{city}：未能从首页获取线路分类，使用默认分类")
+            bus_head = BUS_HEAD
+
+    tasks = skip_seen(iter_route_urls(base_url, bus_head, limiter, cache, parser, writer.write_error),
+                      set(journal.done))
+
+    def crawl(task):
+        route_url, record, error = crawl_route(task[0], task[1], limiter, cache, only_changed, parser)
+        if error:
+            return route_url, None, error
+        # 在抓取线程中整理好写入 bus.txt 和 bus.jsonl 的内容
+        line = json.dumps(build_route_record(route_url, record), ensure_ascii=False) + '\n'
+        return route_url, (format_route_block(route_url, record), line), None
+
+    executor = ThreadPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+    try:
+        if executor is None:
+            results = map(crawl, tasks)
+        else:
+            # 线程池并发抓取详细页面；按提交顺序返回结果，写出的内容与顺序抓取完全一致
+            results = ordered_map(executor, crawl, tasks, max_workers * 2)
+        # 按提交顺序交给写入线程，整条线路一次性写入后再记入日志
+        for route_url, contents, error in results:
+            if error:
+                writer.write_error(error)
+            else:
+                writer.write_route(route_url, contents)
+    finally:
+        if executor is not None:
+            # 正常结束时已没有未完成的任务；中断或写入出错时取消尚未开始的任务
+            executor.shutdown(cancel_futures=True)
+        writer.close()
+        if cache is not None:
+            print(f"{city} 网页缓存：{cache.unchanged} 个网页未变化，{cache.changed} 个网页新增或已更新")
+            cache.close()
+    # 抓取完成后删除日志，只有中断的抓取才从断点继续；下次运行重新抓取全部线路
+    journal.clear()
+    return writer.written, writer.failed
+
+
+def main(max_workers=MAX_WORKERS, delay=REQUEST_DELAY, resume=True,
+         cache_dir=CACHE_DIR, only_changed=ONLY_CHANGED, parser=PARSER):
+    # 广州公交网，输出到当前文件夹；上次抓取已完成时重新抓取全部线路，
+    # 未变化的网页从 page_cache 读取、不再重新解析，每周更新数据时直接运行即可
+    return crawl_city('guangzhou', '.', max_workers=max_workers, delay=delay, resume=resume,
+                      cache_dir=cache_dir, only_changed=only_changed, parser=parser)
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
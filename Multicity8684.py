@@ -0,0 +1,60 @@
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import Guangzhou8684
+
+# 需要抓取的城市（8684 城市拼音），默认为珠三角九市
+CITIES = ['guangzhou', 'shenzhen', 'foshan', 'dongguan', 'zhongshan',
+          'zhuhai', 'jiangmen', 'zhaoqing', 'huizhou']
+# 同时抓取的城市数（进程数）；每个城市是单独的域名，在各自进程内按 Guangzhou8684.py 的
+# MAX_WORKERS、REQUEST_DELAY 限制请求频率
+PROCESSES = 4
+# 各城市的输出保存在 OUTPUT_DIR/城市拼音/ 下，合并后的数据保存在 OUTPUT_DIR 下
+OUTPUT_DIR = '8684_cities'
+MERGED_TEXT = 'bus_all.txt'
+MERGED_RECORDS = 'bus_all.jsonl'
+
+
+def crawl(city):
+    return Guangzhou8684.crawl_city(city, os.path.join(OUTPUT_DIR, city))
+
+
+def merge(cities):
+    """按 CITIES 的顺序合并各城市的 bus.txt 和 bus.jsonl，结构化记录中增加 city 字段"""
+    with open(os.path.join(OUTPUT_DIR, MERGED_TEXT), 'w', encoding='utf-8') as text_out, \
+            open(os.path.join(OUTPUT_DIR, MERGED_RECORDS), 'w', encoding='utf-8') as records_out:
+        for city in cities:
+            city_dir = os.path.join(OUTPUT_DIR, city)
+            text_path = os.path.join(city_dir, Guangzhou8684.OUTPUT_FILE)
+            if os.path.exists(text_path):
+                with open(text_path, 'r', encoding='utf-8') as f:
+                    shutil.copyfileobj(f, text_out)
+            records_path = os.path.join(city_dir, Guangzhou8684.RECORD_FILE)
+            if os.path.exists(records_path):
+                with open(records_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        record = json.loads(line)
+                        record['city'] = city
+                        records_out.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def main(cities=CITIES, processes=PROCESSES):
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {executor.submit(crawl, city): city for city in cities}
+        for future in as_completed(futures):
+            city = futures[future]
+            try:
+                written, failed = future.result()
+                print(f"{city} 抓取完成：写入 {written} 条线路，失败 {failed} 条")
+            except Exception as e:
+                print(f"{city} 抓取失败：{str(e)}")
+
+    merge(cities)
+    print(f"合并结果已保存至 {os.path.join(OUTPUT_DIR, MERGED_TEXT)} 和 {os.path.join(OUTPUT_DIR, MERGED_RECORDS)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,27 @@
 import shapefile as sp
 import requests as re
 import json
+import math
 import pandas as pd
 import time
 import os
+import sqlite3
 import sys
 import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+try:
+    from shapely.geometry import Point, box, shape
+    from shapely.ops import unary_union
+    from shapely.prepared import prep
+except ImportError:  # 未安装 shapely 时功能3按外接矩形查询，不剔除区域外的矩形
+    shape = None
 from decimal import Decimal, getcontext
 
+import coords
+
 # 设置高精度（可根据需要调整精度）
 getcontext().prec = 12
 
@@ -15,72 +29,202 @@ getcontext().prec = 12
 class QuotaExhaustedError(Exception):
     pass
 
-# 全局变量用于批量爬取进度（仅在功能3中使用）
-progress_data = {}
-batch_mode = False  # 标识是否在批量爬取模式下
+# 高德接口地址（可通过环境变量 AMAP_API 指向本地回放服务 replay_server.py）
+AMAP_API = os.environ.get("AMAP_API", "https://restapi.amap.com")
+
+# 每个 key 每秒最多请求次数（高德个人开发者搜索类接口的并发上限为 3 次/秒，企业开发者可按配额调高）
+KEY_QPS = 3
+
+# 高德 infocode：每日配额用完（10003 访问已超出日访问量，10044 账号日调用量超限）
+DAILY_LIMIT_CODES = {"10003", "10044"}
+# key 无效（10001 key 不正确或过期，10009 key 与平台不匹配），同样停用到次日
+INVALID_KEY_CODES = {"10001", "10009"}
+# 超出并发量或每分钟访问量，稍后换一个 key 重试
+BUSY_CODES = {"10004", "10014", "10019", "10020", "10021"}
+BUSY_RETRIES = 3
+# 各 key 的调用记录，下次运行时继续使用
+KEY_LEDGER = "key_ledger.json"
+# 高德的每日配额在北京时间 0 点重置
+RESET_TZ = timezone(timedelta(hours=8))
+# 每调用多少次保存一次调用记录（key 用完时和程序退出时也会保存）
+LEDGER_SAVE_EVERY = 50
+
+# 全局变量：存放多个 key 以及调度这些 key 的 KeyPool
+KEY_LIST = []
+key_pool = None
 
-# 进度保存与恢复函数（针对功能3）
-def save_progress(progress_data, filename="progress.json"):
-    with open(filename, "w", encoding="utf-8") as f:
-        json.dump(progress_data, f, ensure_ascii=False, indent=4)
-    print("当前进度已保存至", filename)
 
-def load_progress(filename="progress.json"):
-    with open(filename, "r", encoding="utf-8") as f:
-        progress_data = json.load(f)
-    print("已加载进度文件", filename)
-    return progress_data
+class TokenBucket:
+    """令牌桶限速：每秒补充 rate 个令牌，最多积累 rate 个，每次请求取走一个，令牌不足时等待"""
 
-# atexit处理函数，若在批量爬取模式下且未完成，则自动保存当前进度
-def force_save_progress():
-    global batch_mode, progress_data
-    if batch_mode and progress_data:
-        save_progress(progress_data)
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
 
-atexit.register(force_save_progress)
+    def delay(self):
+        """现在请求需要等待的秒数"""
+        with self.lock:
+            tokens = min(self.rate, self.tokens + (time.monotonic() - self.updated) * self.rate)
+        return max(0.0, (1 - tokens) / self.rate)
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # 预先扣除令牌，再在锁外等待，同一 key 的多个线程依次排队
+            self.tokens -= 1
+            wait = -self.tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
 
-# 全局变量：存放多个 key 以及当前使用的 key 指针
-KEY_LIST = []
-current_key_index = 0
 
-def get_current_key():
-    global KEY_LIST, current_key_index
-    return KEY_LIST[current_key_index]
+def next_reset(now=None):
+    """下一次配额重置（北京时间 0 点）的时间戳"""
+    now = datetime.fromtimestamp(time.time() if now is None else now, RESET_TZ)
+    return (now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)).timestamp()
 
-def rotate_key():
-    global current_key_index, KEY_LIST
-    current_key_index = (current_key_index + 1) % len(KEY_LIST)
-    print("切换至新 key：", get_current_key())
+
+class KeyPool:
+    """
+    多个 key 的调度：
+    - 可以立即请求（令牌桶有令牌）的 key 中，优先使用最健康的（出错率最低、当日调用次数最少）；
+    - key 返回每日配额用完或 key 无效时，停用到次日 0 点配额重置，期间不再用它发出任何请求；
+    - 每个 key 的累计调用次数、出错次数、当日调用次数和停用时间保存在 ledger_path 中，
+      下次运行时继续使用，当天已用完的 key 不会再被尝试。
+    """
+
+    def __init__(self, keys, ledger_path=KEY_LEDGER, qps=KEY_QPS):
+        self.keys = list(dict.fromkeys(keys))
+        self.ledger_path = ledger_path
+        self.buckets = {key: TokenBucket(qps) for key in self.keys}
+        self.lock = threading.Lock()
+        self.unsaved = 0
+        saved = {}
+        if ledger_path and os.path.exists(ledger_path):
+            with open(ledger_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        today = datetime.now(RESET_TZ).strftime("%Y-%m-%d")
+        self.ledger = {}
+        for key in self.keys:
+            entry = {"calls": 0, "errors": 0, "day": today, "day_calls": 0, "exhausted_until": 0,
+                     **saved.get(key, {})}
+            if entry["day"] != today:
+                entry["day"], entry["day_calls"] = today, 0
+            self.ledger[key] = entry
+
+    def alive(self):
+        now = time.time()
+        return [key for key in self.keys if self.ledger[key]["exhausted_until"] <= now]
+
+    def health(self, key):
+        entry = self.ledger[key]
+        return (entry["errors"] / entry["calls"] if entry["calls"] else 0.0, entry["day_calls"])
+
+    def acquire(self):
+        """
+        选出本次请求使用的 key 并等待其令牌桶放行；所有 key 均已停用时抛出 QuotaExhaustedError。
+        等待期间该 key 可能因其他线程的请求返回配额用完而停用，放行后再检查一次，已停用则重新选择 key
+        """
+        while True:
+            with self.lock:
+                alive = self.alive()
+                if not alive:
+                    raise QuotaExhaustedError("所有 key 均已用完额度，请稍后再试或添加新 key。")
+                key = min(alive, key=lambda k: (self.buckets[k].delay(), self.health(k)))
+            self.buckets[key].acquire()
+            with self.lock:
+                if self.ledger[key]["exhausted_until"] > time.time():
+                    continue
+                self.ledger[key]["calls"] += 1
+                self.ledger[key]["day_calls"] += 1
+                self.unsaved += 1
+            return key
+
+    def report(self, key, result):
+        """记录请求结果，配额用完或无效的 key 停用到次日 0 点，返回该 key 是否已停用"""
+        infocode = str(result.get("infocode", ""))
+        with self.lock:
+            entry = self.ledger[key]
+            dead = infocode in DAILY_LIMIT_CODES or infocode in INVALID_KEY_CODES
+            if result.get("status") != "1":
+                entry["errors"] += 1
+            if dead:
+                entry["exhausted_until"] = next_reset()
+            if dead or self.unsaved >= LEDGER_SAVE_EVERY:
+                self._save()
+        return dead
+
+    def save(self):
+        with self.lock:
+            self._save()
+
+    def _save(self):
+        if not self.ledger_path:
+            return
+        saved = {}
+        if os.path.exists(self.ledger_path):
+            with open(self.ledger_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        saved.update(self.ledger)
+        tmp_path = self.ledger_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(saved, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, self.ledger_path)
+        self.unsaved = 0
+
+    def summary(self):
+        alive = set(self.alive())
+        return "；".join(f"{key[:6]}… 调用 {e['day_calls']} 次{'' if key in alive else '（已停用）'}"
+                        for key, e in self.ledger.items())
+
+
+def set_keys(keys):
+    """设置本次使用的 key，并建立调度这些 key 的 KeyPool"""
+    global KEY_LIST, key_pool
+    KEY_LIST = keys
+    key_pool = KeyPool(keys)
+
+# 程序退出时保存各 key 的调用记录
+def save_key_ledger():
+    if key_pool is not None:
+        key_pool.save()
+
+atexit.register(save_key_ledger)
 
 def multi_key_request(url: str, params: dict) -> dict:
     """
-    采用轮询方式请求：
-    - 每次请求使用当前 key，然后立即 rotate 到下一个 key；
-    - 如果返回结果 status 为 "0" 且 infocode 为 "10003"（每日额度超限），
-      则该次请求继续尝试下一 key，直到所有 key 均尝试过为止。
+    通过 key_pool 请求：
+    - 每次请求使用可以立即请求的 key 中最健康的一个，每个 key 每秒最多请求 KEY_QPS 次；
+    - 如果返回每日额度超限（infocode 10003 等）或 key 无效，该 key 停用到次日 0 点，
+      本次请求换下一个 key 重试，其他线程中正在等待该 key 的请求也在发出前改用其他 key；所有 key 均已停用时抛出 QuotaExhaustedError，不再发出请求；
+    - 超出并发量时稍后换一个 key 重试，最多 BUSY_RETRIES 次。
     """
-    tried = 0
-    while tried < len(KEY_LIST):
-        current = get_current_key()
-        params['key'] = current
-        response = re.get(url, params=params)
+    busy = 0
+    while True:
+        current = key_pool.acquire()
+        response = re.get(url, params={**params, 'key': current})
         result = json.loads(response.text)
-        # 每次请求后立即轮询到下一个 key
-        rotate_key()
-        if result.get('status') == '1':
-            return result
-        elif result.get('status') == '0' and result.get('infocode') == "10003":
-            print("Key", current, "超出每日限额，尝试下一个 key。")
-            tried += 1
-            time.sleep(0.2)
+        if key_pool.report(current, result):
+            print("Key", current, "超出每日限额或无效，停用到次日 0 点，换下一个 key。")
             continue
-        else:
-            return result
-    raise QuotaExhaustedError("所有 key 均已用完额度，请稍后再试或添加新 key。")
+        if result.get('status') == '0' and str(result.get('infocode')) in BUSY_CODES and busy < BUSY_RETRIES:
+            busy += 1
+            time.sleep(0.5 * busy)
+            continue
+        return result
 
 # ------------------- 各接口函数 -------------------
 
-def poibian1(bianjiestr: str, guanjianci: str, leixing: str) -> dict:
+# 高德 v5 多边形检索每页最多 25 条
+PAGE_SIZE = 25
+# 第一页已满的矩形：估计 POI 数不超过 PAGING_LIMIT 时继续翻页，超过时细分
+PAGING_LIMIT = 100
+MAX_PAGES = PAGING_LIMIT // PAGE_SIZE
+
+def poibian1(bianjiestr: str, guanjianci: str, leixing: str, page_num: int = 1) -> dict:
     params = {
         'polygon': bianjiestr,
         'types': leixing,
@@ -88,42 +232,294 @@ def poibian1(bianjiestr: str, guanjianci: str, leixing: str) -> dict:
         'page_size': '25',
         'show_fields': 'children,business,indoor,navi,photos'
     }
-    return multi_key_request("https://restapi.amap.com/v5/place/polygon?parameters", params)
+    if page_num > 1:
+        params['page_num'] = str(page_num)
+    return multi_key_request(f"{AMAP_API}/v5/place/polygon?parameters", params)
 
-def poibian0(bianjiestr: str, guanjianci: str, leixing: str) -> dict:
+def poibian0(bianjiestr: str, guanjianci: str, leixing: str, page_num: int = 1) -> dict:
     params = {
         'polygon': bianjiestr,
         'types': leixing,
         'keywords': guanjianci,
         'page_size': '25'
     }
-    return multi_key_request("https://restapi.amap.com/v5/place/polygon?parameters", params)
-
-def Judge1(ax: float, ay: float, bx: float, by: float, guanjianci: str, leixing: str):
-    bianjiestr = f"{ax},{ay}|{bx},{by}"
-    res = poibian1(bianjiestr, guanjianci, leixing)
+    if page_num > 1:
+        params['page_num'] = str(page_num)
+    return multi_key_request(f"{AMAP_API}/v5/place/polygon?parameters", params)
+
+def Judge1(ax: float, ay: float, bx: float, by: float, guanjianci: str, leixing: str, polygon: str = None,
+           page_num: int = 1):
+    """查询矩形（或 polygon 多边形）的第 page_num 页，返回查询结果；结果满一页（no）说明可能还有更多 POI"""
+    bianjiestr = polygon or f"{ax},{ay}|{bx},{by}"
+    res = poibian1(bianjiestr, guanjianci, leixing, page_num)
     count = len(res.get('pois', []))
-    if count >= 25:
+    if count >= PAGE_SIZE:
         print(count, "no")
-        return 0
     else:
         print(count, "yes")
-        return res
+    return res
 
-def Judge0(ax: float, ay: float, bx: float, by: float, guanjianci: str, leixing: str):
-    bianjiestr = f"{ax},{ay}|{bx},{by}"
-    res = poibian0(bianjiestr, guanjianci, leixing)
+def Judge0(ax: float, ay: float, bx: float, by: float, guanjianci: str, leixing: str, polygon: str = None,
+           page_num: int = 1):
+    """查询矩形（或 polygon 多边形）的第 page_num 页，返回查询结果；结果满一页（no）说明可能还有更多 POI"""
+    bianjiestr = polygon or f"{ax},{ay}|{bx},{by}"
+    res = poibian0(bianjiestr, guanjianci, leixing, page_num)
     count = len(res.get('pois', []))
-    if count >= 25:
+    if count >= PAGE_SIZE:
         print(count, "no")
-        return 0
     else:
         print(count, "yes")
-        return res
+    return res
+
+# 矩形与目标区域的关系
+OUTSIDE, INSIDE, BOUNDARY = 0, 1, 2
+# 边界上的矩形改为以矩形与区域的交集（多边形）查询
+POLYGON_QUERY = True
+# 交集多边形的顶点数超过该值时仍按矩形查询
+MAX_POLYGON_POINTS = 100
+
+class TargetRegion:
+    """
+    目标区域.shp 的实际边界（shapely 预处理几何），供功能3使用：
+    - 与区域不相交的矩形（海面、区外）直接剔除，不再查询；
+    - 完全在区域内的矩形，其中的 POI 无需再判断是否在区域内；
+    - 边界上的矩形可改为以其与区域的交集多边形查询，返回的 POI 仍逐个判断是否在区域内。
+    """
+
+    def __init__(self, reader):
+        self.geometry = unary_union([shape(s.__geo_interface__) for s in reader.shapes()]).buffer(0)
+        self.prepared = prep(self.geometry)
+
+    def rect_state(self, rect):
+        rect_box = box(*rect)
+        # 只在边上或角点与区域接触的矩形（交集面积为 0）同样视为区域外，否则会按整个矩形查询并沿接触点反复细分
+        if not self.prepared.intersects(rect_box) or self.prepared.touches(rect_box):
+            return OUTSIDE
+        if self.prepared.contains(rect_box):
+            return INSIDE
+        return BOUNDARY
+
+    def polygon_param(self, rect):
+        """矩形与区域的交集为单个无洞多边形且顶点不多时，返回高德 polygon 参数，否则返回 None"""
+        part = self.geometry.intersection(box(*rect))
+        if part.geom_type != 'Polygon' or part.interiors or len(part.exterior.coords) > MAX_POLYGON_POINTS:
+            return None
+        return '|'.join(f"{x:.6f},{y:.6f}" for x, y in part.exterior.coords)
+
+    def covers(self, location):
+        """“经度,纬度”是否在区域内（含边界）"""
+        try:
+            lng, lat = (float(v) for v in location.split(','))
+        except (AttributeError, ValueError):
+            return False
+        return self.prepared.covers(Point(lng, lat))
+
+def quad_split(rect):
+    """把矩形 [ax, ay, bx, by] 四等分"""
+    ax, ay, bx, by = rect
+    mx, my = round((ax + bx) / 2, 6), round((ay + by) / 2, 6)
+    return [[ax, ay, mx, my], [mx, ay, bx, my], [ax, my, mx, by], [mx, my, bx, by]]
+
+def location_xy(locations):
+    """“经度,纬度”字符串的经度、纬度列表，无法解析的跳过"""
+    xs, ys = [], []
+    for location in locations:
+        try:
+            x, y = (float(v) for v in location.split(','))
+        except (AttributeError, ValueError):
+            continue
+        xs.append(x)
+        ys.append(y)
+    return xs, ys
+
+def split_rect(rect, pois, estimate):
+    """
+    细分结果已满的矩形，返回 [(小矩形, 估计 POI 数), ...]。
+    已获取的 POI 是矩形内 POI 的样本：各小矩形的估计 POI 数按样本落在其中的比例分配。
+    估计 POI 数不超过 2 × PAGING_LIMIT 时，沿样本更分散的方向（按米计）在样本中位数处一分为二，
+    两侧的 POI 数大致相同、都可以翻页取完；否则（包括翻到 MAX_PAGES 页仍未取完，POI 数未知）四等分
+    """
+    ax, ay, bx, by = rect
+    xs, ys = location_xy(poi.get('location') for poi in pois)
+    total = max(estimate or 0, len(xs))
+    children = None
+    if 2 <= len(xs) < PAGING_LIMIT and total <= 2 * PAGING_LIMIT:
+        spread_x = (max(xs) - min(xs)) * math.cos(math.radians((ay + by) / 2))
+        spread_y = max(ys) - min(ys)
+        values, lo, hi = (xs, ax, bx) if spread_x >= spread_y else (ys, ay, by)
+        # 切分位置限制在矩形中间 80% 的范围内，避免切出过窄的矩形
+        cut = round(min(max(sorted(values)[len(values) // 2], lo + (hi - lo) * 0.1), hi - (hi - lo) * 0.1), 6)
+        if lo < cut < hi:
+            children = ([[ax, ay, cut, by], [cut, ay, bx, by]] if spread_x >= spread_y
+                        else [[ax, ay, bx, cut], [ax, cut, bx, by]])
+    if children is None:
+        children = quad_split(rect)
+    result = []
+    for cx0, cy0, cx1, cy1 in children:
+        inside = sum(1 for x, y in zip(xs, ys) if cx0 <= x <= cx1 and cy0 <= y <= cy1)
+        result.append(([cx0, cy0, cx1, cy1], round(total * (inside + 1) / (len(xs) + 2))))
+    return result
+
+def simulate_quadtree_calls(locations, root, region=None):
+    """
+    在已获取的 POI 坐标 locations 上模拟原来的方案（第一页满 25 条即四等分、不翻页）查询同一区域需要的请求次数。
+    区域外的矩形同样剔除；以矩形查询的边界矩形中区域外的 POI 未计入，结果为估计值
+    """
+    xs, ys = location_xy(locations)
+    calls = 0
+    queue = [root]
+    while queue:
+        ax, ay, bx, by = queue.pop()
+        calls += 1
+        count = sum(1 for x, y in zip(xs, ys) if ax <= x <= bx and ay <= y <= by)
+        if count >= PAGE_SIZE:
+            queue += [c for c in quad_split([ax, ay, bx, by]) if region is None or region.rect_state(c) != OUTSIDE]
+    return calls
+
+# 功能3的查询结果和进度
+STORE_PATH = "按shp查询POI.sqlite"
+DETAIL_COLUMNS = ['poi 名称', 'poi 唯一标识', 'poi 经纬度', 'poi 所属类型', 'poi 分类编码',
+                  'poi 所属省份', 'poi 所属城市', 'poi 所属区县',
+                  'poi 详细地址', 'poi 所属省份编码', 'poi 所属区域编码', 'poi 所属城市编码',
+                  'poi 营业时间',
+                  '子 poi 唯一标识', '子 poi 名称', '子 poi 经纬度', '子 poi 详细地址',
+                  '子 poi 所属类型', '子 poi 分类编码',
+                  'poi 所属商圈', 'poi 的联系电话', 'poi 特色内容', 'poi 评分',
+                  'poi 人均消费', '停车场类型', 'poi 的别名',
+                  '是否有室内地图标志', '所在建筑物的 POI ID',
+                  '楼层索引', '所在楼层',
+                  'poi 对应的导航引导点坐标', 'poi 的入口经纬度坐标',
+                  'poi 的出口经纬度坐标', 'poi 的地理格 id',
+                  'poi 的图片介绍', 'poi 图片的下载链接']
+BRIEF_COLUMNS = ['名称', '坐标', 'POI类型', '详细地址', '城市', '区县']
+
+def nested(data, *path):
+    """依次取 data[path[0]][path[1]]...，取不到时返回空字符串"""
+    try:
+        for key in path:
+            data = data[key]
+        return data
+    except Exception:
+        return ''
+
+def flatten_poi(poi, detail_mode):
+    """把一个 POI 展开为输出表格的一行（列与 DETAIL_COLUMNS / BRIEF_COLUMNS 相同）"""
+    if detail_mode != 1:
+        return {'名称': poi.get('name', ''), '坐标': poi.get('location', ''), 'POI类型': poi.get('type', ''),
+                '详细地址': poi.get('address', ''), '城市': poi.get('cityname', ''), '区县': poi.get('adname', '')}
+    row = {
+        'poi 名称': poi.get('name', ''), 'poi 唯一标识': poi.get('id', ''), 'poi 经纬度': poi.get('location', ''),
+        'poi 所属类型': poi.get('type', ''), 'poi 分类编码': poi.get('typecode', ''),
+        'poi 所属省份': poi.get('pname', ''), 'poi 所属城市': poi.get('cityname', ''),
+        'poi 所属区县': poi.get('adname', ''), 'poi 详细地址': poi.get('address', ''),
+        'poi 所属省份编码': poi.get('pcode', ''), 'poi 所属区域编码': poi.get('adcode', ''),
+        'poi 所属城市编码': poi.get('citycode', ''),
+        # poi营业时间，从business中获取opentime_week字段
+        'poi 营业时间': nested(poi, 'business', 'opentime_week'),
+        '子 poi 唯一标识': nested(poi, 'children', 'id'), '子 poi 名称': nested(poi, 'children', 'name'),
+        '子 poi 经纬度': nested(poi, 'children', 'location'), '子 poi 详细地址': nested(poi, 'children', 'address'),
+        '子 poi 所属类型': nested(poi, 'children', 'subtype'), '子 poi 分类编码': nested(poi, 'children', 'typecode'),
+        'poi 所属商圈': nested(poi, 'business', 'business_area'), 'poi 的联系电话': nested(poi, 'business', 'tel'),
+        'poi 特色内容': nested(poi, 'business', 'tag'), 'poi 评分': nested(poi, 'business', 'rating'),
+        'poi 人均消费': nested(poi, 'business', 'cost'), '停车场类型': nested(poi, 'business', 'parking_type'),
+        'poi 的别名': nested(poi, 'business', 'alias'),
+        'poi 对应的导航引导点坐标': nested(poi, 'navi', 'navi_poiid'),
+        'poi 的入口经纬度坐标': nested(poi, 'navi', 'entr_location'),
+        'poi 的出口经纬度坐标': nested(poi, 'navi', 'exit_location'),
+        'poi 的地理格 id': nested(poi, 'navi', 'gridcode'),
+        'poi 的图片介绍': nested(poi, 'photos', 0, 'title'), 'poi 图片的下载链接': nested(poi, 'photos', 0, 'url'),
+    }
+    # 未处理的字段为空
+    return {column: row.get(column, '') for column in DETAIL_COLUMNS}
+
+class PoiStore:
+    """
+    功能3的查询结果和进度，只追加地写入 SQLite 数据库：
+    - queue：待查询的矩形队列 CurPolList，细分出的矩形追加在末尾；
+    - responses：每个已查询矩形各页的原始响应，每个矩形只写一次；
+    - pois：展开后的 POI，按 id 去重（没有 id 的 POI 按所在矩形和序号编号）；
+    - meta：已处理的矩形数 i、累计请求次数以及关键词、类型等查询参数。
+    每个矩形的响应、POI、细分出的矩形和 i 在同一个事务中写入，程序崩溃或被强制结束时最多损失正在处理的矩形，
+    内存中不再累积结果；输出的 xlsx 由数据库生成。
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        # WAL 模式下每个事务只追加写入日志，进程被强制结束不会损坏数据库
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        with self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS queue (idx INTEGER PRIMARY KEY, rect TEXT)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS responses (idx INTEGER PRIMARY KEY, split INTEGER, response TEXT)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS pois (seq INTEGER PRIMARY KEY, id TEXT UNIQUE, location TEXT, row TEXT)")
+            self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def get(self, key, default=None):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set(self, **values):
+        self.db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                            [(k, json.dumps(v, ensure_ascii=False)) for k, v in values.items()])
+
+    def unfinished(self):
+        """上次的查询是否未完成"""
+        total = self.db.execute("SELECT COUNT(*) FROM queue").fetchone()[0]
+        return 0 < self.get('i', 0) < total
+
+    def start(self, queue, **params):
+        """清空上次的结果，开始新的查询"""
+        with self.db:
+            for table in ('queue', 'responses', 'pois', 'meta'):
+                self.db.execute(f"DELETE FROM {table}")
+            self.db.executemany("INSERT INTO queue (rect) VALUES (?)", [(json.dumps(r),) for r in queue])
+            self._set(i=0, calls=0, **params)
+
+    def load(self):
+        """返回 (矩形队列, 已处理的矩形数 i, 累计请求次数)"""
+        queue = [json.loads(r) for (r,) in self.db.execute("SELECT rect FROM queue ORDER BY idx")]
+        return queue, self.get('i', 0), self.get('calls', 0)
+
+    def add(self, i, pages, split, pois, children, calls, detail_mode):
+        """写入第 i 个矩形的结果（pages 为各页的原始响应），返回新增（未重复）的 POI 行"""
+        rows = []
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                            (i, int(split), json.dumps(pages, ensure_ascii=False)))
+            for n, poi in enumerate(pois):
+                row = flatten_poi(poi, detail_mode)
+                cursor = self.db.execute("INSERT OR IGNORE INTO pois (id, location, row) VALUES (?, ?, ?)",
+                                         (poi.get('id') or f"{i}-{n}", poi.get('location', ''),
+                                          json.dumps(row, ensure_ascii=False)))
+                if cursor.rowcount:
+                    rows.append(row)
+            self.db.executemany("INSERT INTO queue (rect) VALUES (?)", [(json.dumps(r),) for r in children])
+            self._set(i=i + 1, calls=calls)
+        return rows
+
+    def poi_count(self):
+        return self.db.execute("SELECT COUNT(*) FROM pois").fetchone()[0]
+
+    def locations(self):
+        return [loc for (loc,) in self.db.execute("SELECT location FROM pois ORDER BY seq")]
+
+    def poi_frame(self):
+        columns = DETAIL_COLUMNS if self.get('detail_mode') == 1 else BRIEF_COLUMNS
+        return pd.DataFrame([json.loads(r) for (r,) in self.db.execute("SELECT row FROM pois ORDER BY seq")],
+                            columns=columns)
+
+    def response_frame(self):
+        """有效（status 为 1）的原始响应，每页一行"""
+        pages = [page for (r,) in self.db.execute("SELECT response FROM responses ORDER BY idx") for page in json.loads(r)]
+        return pd.DataFrame([page for page in pages if page.get('status') == '1'])
+
+    def close(self):
+        self.db.close()
 
 def bianma(address: str) -> dict:
     params = {'address': address}
-    return multi_key_request("https://restapi.amap.com/v3/geocode/geo?parameters", params)
+    return multi_key_request(f"{AMAP_API}/v3/geocode/geo?parameters", params)
 
 def poidian1(zuobiao: str, banjing: str, guanjianci: str, leixing: str) -> dict:
     params = {
@@ -134,7 +530,7 @@ def poidian1(zuobiao: str, banjing: str, guanjianci: str, leixing: str) -> dict:
         'page_size': '25',
         'show_fields': 'children,business,navi,photos'
     }
-    return multi_key_request("https://restapi.amap.com/v5/place/around?parameters", params)
+    return multi_key_request(f"{AMAP_API}/v5/place/around?parameters", params)
 
 def poidian0(zuobiao: str, banjing: str, guanjianci: str, leixing: str) -> dict:
     params = {
@@ -144,7 +540,7 @@ def poidian0(zuobiao: str, banjing: str, guanjianci: str, leixing: str) -> dict:
         'types': leixing,
         'page_size': '25'
     }
-    return multi_key_request("https://restapi.amap.com/v5/place/around?parameters", params)
+    return multi_key_request(f"{AMAP_API}/v5/place/around?parameters", params)
 
 # ------------------- 主程序 -------------------
 gongneng = int(input('选择你需要的功能，依据需要的功能输入对应数字并按回车：\n'
@@ -153,9 +549,10 @@ gongneng = int(input('选择你需要的功能，依据需要的功能输入对
                      '3：按shp查询POI（获取大于25个点的数据）\n'))
 # 输入多个 key（用英文逗号分隔）
 key_input = input('请输入你的多个 key（用英文逗号分隔）：\n')
-KEY_LIST = [k.strip() for k in key_input.split(',') if k.strip() != '']
+set_keys([k.strip() for k in key_input.split(',') if k.strip() != ''])
 
 print('如果下面某项不需要填写，请直接按回车')
+region = None  # 功能3的目标区域，展开表程序按其剔除区域外的 POI
 
 # ------------------- 功能1：获取地理编码 -------------------
 if gongneng == 1:
@@ -177,6 +574,7 @@ if gongneng == 1:
             print(f"第{i+1}项 名称：{ResBianma['名称'][i]}  等级：{ResBianma['等级'][i]}  坐标：{ResBianma['坐标'][i]}  城市：{ResBianma['城市'][i]}  区县：{ResBianma['区县'][i]}")
         flag = int(input('是否再次查询？（1：是 / 0：否）\n'))
         shuchu = pd.DataFrame(ResBianma)
+        coords.add_wgs84_columns(shuchu, '坐标', 'gcj02')  # 高德坐标为 GCJ02，增加 WGS84 坐标
         shuchu.to_excel('地理编码.xlsx', sheet_name='全部', index=False)
         yuanshi.to_excel('地理编码_原始获取.xlsx', sheet_name='全部', index=False)
         print('结果已生成在程序根目录下的“地理编码.xlsx”和“地理编码_原始获取.xlsx”文件')
@@ -329,6 +727,7 @@ elif gongneng == 2:
                       " 区县：", ResDian['区县'][-1])
         flag = int(input('是否再次查询？（1/0）\n'))
         shuchu = pd.DataFrame(ResDian)
+        coords.add_wgs84_columns(shuchu, 'poi 经纬度' if 'poi 经纬度' in shuchu.columns else '坐标', 'gcj02')
         if detail_mode == 1:
             shuchu.to_excel('按半径查询POI_详细信息.xlsx', sheet_name='全部', index=False)
             yuanshi.to_excel('按半径查询POI_详细信息_原始获取.xlsx', sheet_name='全部', index=False)
@@ -347,210 +746,116 @@ elif gongneng == 3:
     MaxPolBox = MaxPol.bbox
     MaxPolBoxFlo = [round(float(MaxPolBox[0]), 6), round(float(MaxPolBox[1]), 6),
                     round(float(MaxPolBox[2]), 6), round(float(MaxPolBox[3]), 6)]
-    ResPolList = []
-    # 初始查询区域队列，后续可能会细分
-    CurPolList = [MaxPolBoxFlo]
-    i = 0
-    yuanshi = pd.DataFrame({})
-    # 开启批量爬取模式，便于在退出时强制保存进度
-    batch_mode = True
+    # 按目标区域的实际边界剔除区域外的矩形
+    if shape is not None:
+        region = TargetRegion(MaxPol)
+    else:
+        region = None
+        print("未安装 shapely（pip install shapely），按外接矩形查询，不剔除区域外的矩形")
+    pruned = 0  # 剔除的区域外矩形数
     detail_mode = int(input('是否需要详细信息？（1：详细 / 0：简要）（这里必须选择1，不然会出问题）\n'))
-    if detail_mode == 1:
-        ResList = {'poi 名称': [], 'poi 唯一标识': [], 'poi 经纬度': [], 'poi 所属类型': [], 'poi 分类编码': [],
-                   'poi 所属省份': [], 'poi 所属城市': [], 'poi 所属区县': [],
-                   'poi 详细地址': [], 'poi 所属省份编码': [], 'poi 所属区域编码': [], 'poi 所属城市编码': [],
-                   'poi 营业时间': [],
-                   '子 poi 唯一标识': [], '子 poi 名称': [], '子 poi 经纬度': [], '子 poi 详细地址': [],
-                   '子 poi 所属类型': [], '子 poi 分类编码': [],
-                   'poi 所属商圈': [], 'poi 的联系电话': [], 'poi 特色内容': [], 'poi 评分': [],
-                   'poi 人均消费': [], '停车场类型': [], 'poi 的别名': [],
-                   '是否有室内地图标志': [], '所在建筑物的 POI ID': [],
-                   '楼层索引': [], '所在楼层': [],
-                   'poi 对应的导航引导点坐标': [], 'poi 的入口经纬度坐标': [],
-                   'poi 的出口经纬度坐标': [], 'poi 的地理格 id': [],
-                   'poi 的图片介绍': [], 'poi 图片的下载链接': []}
+
+    # 查询结果和进度随时写入 STORE_PATH；若上次的查询未完成，则询问是否恢复
+    store = PoiStore(STORE_PATH)
+    if store.unfinished() and input("检测到之前保存的进度，是否恢复？ (1/0): ").strip() == "1":
+        CurPolList, i, calls = store.load()
+        guanjianci, leixing, detail_mode = store.get('guanjianci'), store.get('leixing'), store.get('detail_mode')
+        print(f"已恢复进度：已查询 {i} 个矩形，队列总数 {len(CurPolList)}，已获取 {store.poi_count()} 个 POI")
     else:
-        ResList = {'名称': [], '坐标': [], 'POI类型': [], '详细地址': [], '城市': [], '区县': []}
-
-    progress_file = "progress.json"
-    # 若上次有保存进度，则询问是否恢复
-    if os.path.exists(progress_file):
-        resume_choice = input("检测到之前保存的进度，是否恢复？ (1/0): ")
-        if resume_choice.strip() == "1":
-            progress = load_progress(progress_file)
-            CurPolList = progress["CurPolList"]
-            ResPolList = progress["ResPolList"]
-            ResList = progress["ResList"]
-            i = progress["i"]
-            KEY_LIST = progress["KEY_LIST"]
-            current_key_index = progress["current_key_index"]
-        else:
-            os.remove(progress_file)
-            CurPolList = [MaxPolBoxFlo]
-            ResPolList = []
-            i = 0
+        # 初始查询区域队列，后续可能会细分
+        CurPolList = [MaxPolBoxFlo]
+        i = calls = 0  # calls 为累计请求次数
+        store.start(CurPolList, guanjianci=guanjianci, leixing=leixing, detail_mode=detail_mode)
 
+    def query_page(rect, polygon, page_num):
+        ax, ay, bx, by = rect
+        if detail_mode == 1:
+            return Judge1(ax, ay, bx, by, guanjianci, leixing, polygon, page_num)
+        return Judge0(ax, ay, bx, by, guanjianci, leixing, polygon, page_num)
+
+    def query_rect(item):
+        """
+        查询队列中的一个矩形 [ax, ay, bx, by, 估计 POI 数]，返回 (各页的查询结果, 矩形与目标区域的关系, 是否需要细分)。
+        第一页已满时，估计 POI 数未知或不超过 PAGING_LIMIT 则继续翻页，
+        翻到 MAX_PAGES 页仍是满页、或估计数超过 PAGING_LIMIT 时细分；已获取的各页 POI 都保留
+        """
+        rect, estimate = item[:4], (item[4] if len(item) > 4 else None)
+        state = region.rect_state(rect) if region else INSIDE
+        polygon = region.polygon_param(rect) if region and POLYGON_QUERY and state == BOUNDARY else None
+        pages = [query_page(rect, polygon, 1)]
+        if len(pages[0].get('pois', [])) < PAGE_SIZE:
+            return pages, state, False
+        if estimate is not None and estimate > PAGING_LIMIT:
+            return pages, state, True
+        for page_num in range(2, MAX_PAGES + 1):
+            res = query_page(rect, polygon, page_num)
+            pages.append(res)
+            if res.get('status') != '1':
+                # 翻页失败时细分，由小矩形重新获取
+                return pages, state, True
+            if len(res.get('pois', [])) < PAGE_SIZE:
+                return pages, state, False
+        return pages, state, True
+
+    # 多个线程同时查询队列中的矩形，请求速度由各 key 的令牌桶限制，总速度随 key 的数量增加
+    workers = max(1, len(KEY_LIST) * KEY_QPS)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    pending = {}  # 矩形在 CurPolList 中的下标 → 已提交的查询
     print("开始查询区域矩形数：", len(CurPolList))
     try:
         while i < len(CurPolList):
-            ax, ay, bx, by = CurPolList[i]
+            # 提前提交 i 之后已在队列中的矩形，结果仍按队列顺序逐个处理，
+            # 细分出的矩形追加到队列末尾的顺序与逐个查询时完全相同
+            for j in range(i, min(len(CurPolList), i + workers * 2)):
+                if j not in pending:
+                    pending[j] = executor.submit(query_rect, CurPolList[j])
+            pages, state, split = pending.pop(i).result()
+            calls += len(pages)
+            fetched = [poi for page in pages if page.get('status') == '1' for poi in page.get('pois', [])]
+            rect = CurPolList[i][:4]
+            children = []
+            if split:
+                # 当前矩形的 POI 超过一页且未能翻页取完，细分为小矩形（与目标区域不相交的小矩形不再查询），
+                # 并由已获取的 POI 估计各小矩形的 POI 数
+                for child, child_estimate in split_rect(rect, fetched,
+                                                        CurPolList[i][4] if len(CurPolList[i]) > 4 else None):
+                    if region is None or region.rect_state(child) != OUTSIDE:
+                        children.append(child + [child_estimate])
+                    else:
+                        pruned += 1
+            # 边界上的矩形只保留目标区域内的 POI，完全在区域内的矩形无需判断
+            pois = fetched
+            if state == BOUNDARY:
+                pois = [poi for poi in pois if region.covers(poi.get('location'))]
+            if pages[0].get('status') != '1':
+                print("当前矩形未获得有效响应：", pages[0].get('info', ''))
+            # 各页原始响应、POI（细分的矩形已获取的 POI 同样保留，按 id 去重）、细分出的矩形和进度一次写入
+            rows = store.add(i, pages, split, pois, children, calls, detail_mode)
+            CurPolList += children
             if detail_mode == 1:
-                CurPol = Judge1(ax, ay, bx, by, guanjianci, leixing)
-            else:
-                CurPol = Judge0(ax, ay, bx, by, guanjianci, leixing)
-            if type(CurPol) == int:
-                # 若当前矩形返回结果为0（即POI数>=25），则细分当前矩形为四个小矩形
-                CurPolList.append([ax, ay, round((ax + bx) / 2, 6), round((ay + by) / 2, 6)])
-                CurPolList.append([round((ax + bx) / 2, 6), ay, bx, round((ay + by) / 2, 6)])
-                CurPolList.append([ax, round((ay + by) / 2, 6), round((ax + bx) / 2, 6), by])
-                CurPolList.append([round((ax + bx) / 2, 6), round((ay + by) / 2, 6), bx, by])
-            else:
-                if CurPol.get('status') == '1':
-                    yuanshi = pd.concat([yuanshi, pd.DataFrame([CurPol])], ignore_index=True)
-                else:
-                    print("当前矩形未获得有效响应：", CurPol.get('info', ''))
-                if detail_mode == 1:
-                    for poi in CurPol.get('pois', []):
-                        ResList['poi 名称'].append(poi.get('name', ''))
-                        ResList['poi 唯一标识'].append(poi.get('id', ''))
-                        ResList['poi 经纬度'].append(poi.get('location', ''))
-                        ResList['poi 所属类型'].append(poi.get('type', ''))
-                        ResList['poi 分类编码'].append(poi.get('typecode', ''))
-                        ResList['poi 所属省份'].append(poi.get('pname', ''))
-                        ResList['poi 所属城市'].append(poi.get('cityname', ''))
-                        ResList['poi 所属区县'].append(poi.get('adname', ''))
-                        ResList['poi 详细地址'].append(poi.get('address', ''))
-                        ResList['poi 所属省份编码'].append(poi.get('pcode', ''))
-                        ResList['poi 所属区域编码'].append(poi.get('adcode', ''))
-                        ResList['poi 所属城市编码'].append(poi.get('citycode', ''))
-                        # 新增：poi营业时间，从business中获取opentime_week字段
-                        ResList['poi 营业时间'].append(poi.get('business', {}).get('opentime_week', ''))
-                        try:
-                            ResList['子 poi 唯一标识'].append(poi['children']['id'])
-                        except:
-                            ResList['子 poi 唯一标识'].append('')
-                        try:
-                            ResList['子 poi 名称'].append(poi['children']['name'])
-                        except:
-                            ResList['子 poi 名称'].append('')
-                        try:
-                            ResList['子 poi 经纬度'].append(poi['children']['location'])
-                        except:
-                            ResList['子 poi 经纬度'].append('')
-                        try:
-                            ResList['子 poi 详细地址'].append(poi['children']['address'])
-                        except:
-                            ResList['子 poi 详细地址'].append('')
-                        try:
-                            ResList['子 poi 所属类型'].append(poi['children']['subtype'])
-                        except:
-                            ResList['子 poi 所属类型'].append('')
-                        try:
-                            ResList['子 poi 分类编码'].append(poi['children']['typecode'])
-                        except:
-                            ResList['子 poi 分类编码'].append('')
-                        try:
-                            ResList['poi 所属商圈'].append(poi['business']['business_area'])
-                        except:
-                            ResList['poi 所属商圈'].append('')
-                        try:
-                            ResList['poi 的联系电话'].append(poi['business']['tel'])
-                        except:
-                            ResList['poi 的联系电话'].append('')
-                        try:
-                            ResList['poi 特色内容'].append(poi['business']['tag'])
-                        except:
-                            ResList['poi 特色内容'].append('')
-                        try:
-                            ResList['poi 评分'].append(poi['business']['rating'])
-                        except:
-                            ResList['poi 评分'].append('')
-                        try:
-                            ResList['poi 人均消费'].append(poi['business']['cost'])
-                        except:
-                            ResList['poi 人均消费'].append('')
-                        try:
-                            ResList['停车场类型'].append(poi['business']['parking_type'])
-                        except:
-                            ResList['停车场类型'].append('')
-                        try:
-                            ResList['poi 的别名'].append(poi['business']['alias'])
-                        except:
-                            ResList['poi 的别名'].append('')
-                        try:
-                            ResList['poi 对应的导航引导点坐标'].append(poi['navi']['navi_poiid'])
-                        except:
-                            ResList['poi 对应的导航引导点坐标'].append('')
-                        try:
-                            ResList['poi 的入口经纬度坐标'].append(poi['navi']['entr_location'])
-                        except:
-                            ResList['poi 的入口经纬度坐标'].append('')
-                        try:
-                            ResList['poi 的出口经纬度坐标'].append(poi['navi']['exit_location'])
-                        except:
-                            ResList['poi 的出口经纬度坐标'].append('')
-                        try:
-                            ResList['poi 的地理格 id'].append(poi['navi']['gridcode'])
-                        except:
-                            ResList['poi 的地理格 id'].append('')
-                        try:
-                            ResList['poi 的图片介绍'].append(poi['photos'][0]['title'])
-                        except:
-                            ResList['poi 的图片介绍'].append('')
-                        try:
-                            ResList['poi 图片的下载链接'].append(poi['photos'][0]['url'])
-                        except:
-                            ResList['poi 图片的下载链接'].append('')
-                        # 为未处理的字段补充默认值
-                        ResList['是否有室内地图标志'].append('')
-                        ResList['所在建筑物的 POI ID'].append('')
-                        ResList['楼层索引'].append('')
-                        ResList['所在楼层'].append('')
-                        print("POI名称：", ResList['poi 名称'][-1],
-                              " 坐标：", ResList['poi 经纬度'][-1],
-                              " 类型：", ResList['poi 所属类型'][-1],
-                              " 地址：", ResList['poi 详细地址'][-1],
-                              " 营业时间：", ResList['poi 营业时间'][-1],
-                              " 城市：", ResList['poi 所属城市'][-1],
-                              " 区县：", ResList['poi 所属区县'][-1])
-                else:
-                    for poi in CurPol.get('pois', []):
-                        ResList['名称'].append(poi.get('name', ''))
-                        ResList['坐标'].append(poi.get('location', ''))
-                        ResList['POI类型'].append(poi.get('type', ''))
-                        ResList['详细地址'].append(poi.get('address', ''))
-                        ResList['城市'].append(poi.get('cityname', ''))
-                        ResList['区县'].append(poi.get('adname', ''))
-                ResPolList.append(CurPolList[i])
-                if CurPol.get('status') == '1':
-                    yuanshi = pd.concat([yuanshi, pd.DataFrame([CurPol])], ignore_index=True)
-                else:
-                    print("当前矩形未获得有效响应：", CurPol.get('info', ''))
+                for row in rows:
+                    print("POI名称：", row['poi 名称'], " 坐标：", row['poi 经纬度'], " 类型：", row['poi 所属类型'],
+                          " 地址：", row['poi 详细地址'], " 营业时间：", row['poi 营业时间'],
+                          " 城市：", row['poi 所属城市'], " 区县：", row['poi 所属区县'])
             print(f"当前在查询第 {i+1} 个矩形，队列总数：{len(CurPolList)}，当前矩形：{CurPolList[i]}")
             i += 1
-            time.sleep(0.3)
     except QuotaExhaustedError as e:
+        executor.shutdown(wait=False, cancel_futures=True)
         print("错误：", str(e))
-        save_choice = input("检测到所有 key 额度已用完，是否保存当前进度？ (1/0): ")
-        if save_choice.strip() == "1":
-            progress_data = {
-                "CurPolList": CurPolList,
-                "ResPolList": ResPolList,
-                "ResList": ResList,
-                "i": i,
-                "KEY_LIST": KEY_LIST,
-                "current_key_index": current_key_index
-            }
-            save_progress(progress_data)
-        else:
-            print("未保存进度。")
+        print("key 使用情况：", key_pool.summary())
+        print(f"已查询 {i} 个矩形，进度和结果已保存在 {STORE_PATH}，添加新 key 或额度恢复后再次运行即可继续。")
         sys.exit(0)
-
-    if os.path.exists(progress_file):
-        os.remove(progress_file)
-
-    res1 = pd.DataFrame(ResPolList)
-    res2 = pd.DataFrame(ResList)
+    executor.shutdown()
+    if region is not None:
+        print(f"共查询 {i} 个矩形，剔除目标区域外的矩形 {pruned} 个")
+    # 与原来的方案（满一页即四等分）比较请求次数
+    quadtree_calls = simulate_quadtree_calls(store.locations(), MaxPolBoxFlo, region)
+    print(f"共请求 {calls} 次；按原来的四等分方案估计需要 {quadtree_calls} 次，节省 {quadtree_calls - calls} 次")
+
+    # 输出由数据库生成
+    res2 = store.poi_frame()
+    yuanshi = store.response_frame()
+    store.close()
     print(res2)
     # 拆分详细信息中位置字段（若存在“poi 经纬度”，否则拆分“坐标”字段）
     if 'poi 经纬度' in res2.columns:
@@ -559,6 +864,9 @@ elif gongneng == 3:
     elif '坐标' in res2.columns:
         res2['经度'] = res2['坐标'].apply(lambda x: Decimal(x.split(',')[0].strip()) if isinstance(x, str) and ',' in x else None)
         res2['纬度'] = res2['坐标'].apply(lambda x: Decimal(x.split(',')[1].strip()) if isinstance(x, str) and ',' in x else None)
+    # 经度、纬度为高德的 GCJ02 坐标，另外增加转换后的 WGS84 坐标
+    if '经度' in res2.columns:
+        coords.convert_columns(res2, '经度', '纬度', 'gcj02', 'wgs84')
 
     if detail_mode == 1:
         res2.to_excel('按shp查询POI_详细信息.xlsx', sheet_name='全部', index=False)
@@ -608,6 +916,14 @@ df_expanded = (
 # 二次验证数据结构
 df_expanded = df_expanded[df_expanded["pois"].apply(lambda x: isinstance(x, dict))]
 
+# 原始响应未按目标区域裁剪，与详细信息表一样只保留目标区域内的 POI
+if region is not None:
+    df_expanded = df_expanded[df_expanded["pois"].apply(lambda x: region.covers(x.get("location")))]
+
+# 细分的矩形与其中小矩形的响应包含相同的 POI，按 id 去重
+poi_ids = df_expanded["pois"].apply(lambda x: x.get("id"))
+df_expanded = df_expanded[poi_ids.isna() | ~poi_ids.duplicated()]
+
 # 转换为标准化JSON字符串
 df_expanded["pois"] = df_expanded["pois"].apply(
     lambda x: json.dumps(x, ensure_ascii=False) if isinstance(x, dict) else None
@@ -662,6 +978,9 @@ if 'photos' in normalized_df.columns:
     normalized_df['photos.urls'] = normalized_df['photos'].apply(extract_photos_urls)
     normalized_df.drop('photos', axis=1, inplace=True)
 
+# 由 GCJ02 坐标计算 WGS84 坐标（新增）
+coords.convert_columns(normalized_df, 'longitude', 'latitude', 'gcj02', 'wgs84', ('wgs84_longitude', 'wgs84_latitude'))
+
 # 确保经纬度字段为字符串
 normalized_df['longitude'] = normalized_df['longitude'].astype(str)
 normalized_df['latitude'] = normalized_df['latitude'].astype(str)
@@ -0,0 +1,380 @@
+# encoding:utf-8
+"""
+百度地点检索（place/v2/search）获取公交站、地铁站，供 Busget 1.0.py、Metroget 1.0.py 使用：
+- 首页返回的 total 决定需要请求的页数，某一页不足 PAGE_SIZE 条时立即停止，不再请求空白页面；
+- 其余页面由线程池并发请求，每个线程复用自己的 requests.Session；
+- 可同时使用多个 ak，依次轮换；某个 ak 配额用完或无效时自动停用，换下一个继续；
+- 百度每次检索最多返回 RESULT_CAP 条结果，站点密集时结果会被截断。ADAPTIVE 为 True 时，
+  结果达到上限的范围自动四等分后分别检索（矩形范围检索），直到每个范围都不超过上限，结果按 uid 去重；
+- 直接运行本文件时一次获取公交站和地铁站，两类站点的线路合并后只获取一次线路数据。
+"""
+import warnings
+# 过滤 transbigdata 中因添加 geometry 列而触发的 FutureWarning
+warnings.filterwarnings("ignore", category=FutureWarning)
+
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import transbigdata as tbd
+
+import busdata_cache
+import coords
+
+# 接口地址（可通过环境变量 BAIDU_API 指向本地回放服务 replay_server.py）
+API_URL = os.environ.get("BAIDU_API", "https://api.map.baidu.com") + "/place/v2/search"
+PAGE_SIZE = 20  # 百度每页最多 20 条
+MAX_WORKERS = 4  # 同时请求的页数
+REQUEST_TIMEOUT = 30
+MAX_RETRIES = 3
+# ak 无效或配额用完（2xx 无权限、3xx 配额错误等），该 ak 停用
+DEAD_KEY_STATUS = {3, 4, 5, 101, 102}
+# 并发量超过配额，稍后换一个 ak 重试
+BUSY_STATUS = {401}
+# 单次检索最多返回的结果数，total 达到该数时视为结果被截断
+RESULT_CAP = 150
+# 结果被截断时自动细分检索范围
+ADAPTIVE = True
+# 细分的最小范围（度，约 50 米），更小的范围不再细分
+MIN_CELL = 0.0005
+
+_local = threading.local()
+
+
+def get_session():
+    if not hasattr(_local, 'session'):
+        _local.session = requests.Session()
+    return _local.session
+
+
+class BaiduAPIError(Exception):
+    pass
+
+
+class KeyRing:
+    """多个 ak 轮换使用，失效的 ak 不再使用"""
+
+    def __init__(self, keys):
+        if isinstance(keys, str):
+            keys = keys.split(',')
+        self.keys = [k.strip() for k in keys if k.strip()]
+        if not self.keys:
+            raise BaiduAPIError("没有可用的百度 key")
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def next(self):
+        with self._lock:
+            if not self.keys:
+                raise BaiduAPIError("所有百度 key 均已失效或配额用完")
+            key = self.keys[self._next % len(self.keys)]
+            self._next += 1
+            return key
+
+    def disable(self, key, message=''):
+        with self._lock:
+            if key in self.keys:
+                self.keys.remove(key)
+                print(f"百度 key {key[:6]}... 已停用：{message}")
+
+
+class PlaceSearch:
+    """百度地点检索，calls 为已发出的请求数"""
+
+    def __init__(self, keys, max_workers=MAX_WORKERS, page_size=PAGE_SIZE):
+        self.keys = keys if isinstance(keys, KeyRing) else KeyRing(keys)
+        self.max_workers = max_workers
+        self.page_size = page_size
+        self.calls = 0  # 请求数（含重试）
+        self.cells = 0  # 细分检索的范围数
+        self._lock = threading.Lock()
+
+    def request(self, params):
+        """请求一页，返回响应；ak 失效时换下一个 ak 重试"""
+        retries = 0
+        while True:
+            key = self.keys.next()
+            with self._lock:
+                self.calls += 1
+            try:
+                resp = get_session().get(API_URL, params={**params, "ak": key}, timeout=REQUEST_TIMEOUT)
+                resp.raise_for_status()
+                dic = resp.json()
+            except (requests.RequestException, ValueError) as e:
+                retries += 1
+                if retries >= MAX_RETRIES:
+                    raise BaiduAPIError(f"请求失败：{str(e)}")
+                time.sleep(retries)
+                continue
+
+            status = int(dic.get('status', 0))
+            if status == 0:
+                return dic
+            if status in DEAD_KEY_STATUS or 200 <= status < 400:
+                self.keys.disable(key, dic.get('message', status))
+            elif status in BUSY_STATUS and retries + 1 < MAX_RETRIES:
+                retries += 1
+                time.sleep(0.5 * retries)
+            else:
+                raise BaiduAPIError(f"百度接口返回错误 {status}：{dic.get('message', '')}")
+
+    def first_page(self, params):
+        return self.request({**params, "output": "json", "page_size": self.page_size, "page_num": 0})
+
+    def pages(self, params, page_max, first=None):
+        """
+        依次请求各页，返回全部结果。先请求第一页（已请求过时传入 first），按 total 确定页数，
+        其余页面每次并发请求 max_workers 页，遇到不足一页的页面即停止
+        """
+        params = {**params, "output": "json", "page_size": self.page_size}
+        if first is None:
+            first = self.first_page(params)
+        results = list(first.get('results', []))
+        print(f"{params['query']} 第1页...")
+        if len(results) < self.page_size:
+            return results
+        total = first.get('total')
+        if total is not None:
+            page_max = min(page_max, math.ceil(int(total) / self.page_size))
+
+        page = 1
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while page < page_max:
+                batch = range(page, min(page + self.max_workers, page_max))
+                for page_num, dic in zip(batch, executor.map(
+                        lambda p: self.request({**params, "page_num": p}), batch)):
+                    data = dic.get('results', [])
+                    results += data
+                    print(f"{params['query']} 第{page_num + 1}页...")
+                    if len(data) < self.page_size:
+                        return results
+                page = batch.stop
+        return results
+
+    def search(self, query, lat, lng, radius, page_max, adaptive=ADAPTIVE, **extra):
+        """
+        以 (lat, lng) 为中心、radius 米为半径检索 query（BD09 坐标）。
+        adaptive 为 True 且结果达到 RESULT_CAP 时，改为对外接矩形细分检索，只保留半径以内的站点
+        """
+        params = {"query": query, "location": f"{lat},{lng}", "radius": radius, **extra}
+        first = self.first_page(params)
+        if not adaptive or not saturated(first):
+            return self.pages(params, page_max, first)
+
+        lat, lng = float(lat), float(lng)
+        dlat, dlng = radius / 110540, radius / (111320 * math.cos(math.radians(lat)))
+        circle = (lat, lng, radius)
+        results = self.search_bounds(query, (lat - dlat, lng - dlng, lat + dlat, lng + dlng), page_max,
+                                     circle, **extra)
+        return [r for r in results
+                if distance(lng, lat, r['location']['lng'], r['location']['lat']) <= radius]
+
+    def search_bounds(self, query, bounds, page_max, circle=None, **extra):
+        """
+        矩形范围 bounds = (南, 西, 北, 东)（BD09 纬度、经度）内检索 query。结果达到 RESULT_CAP 的范围四等分后
+        继续检索，同一层的各范围并发请求；circle = (纬度, 经度, 半径) 时跳过与该圆不相交的范围。结果按 uid 去重
+        """
+        results = {}
+        cells = [bounds]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while cells:
+                cells = [c for c in cells if circle is None or cell_meets_circle(c, circle)]
+                params = [{"query": query, "bounds": "{},{},{},{}".format(*c), **extra} for c in cells]
+                firsts = list(executor.map(self.first_page, params))
+                with self._lock:
+                    self.cells += len(cells)
+                next_cells = []
+                for cell, cell_params, first in zip(cells, params, firsts):
+                    if saturated(first) and cell[2] - cell[0] > MIN_CELL:
+                        next_cells += split_cell(cell)
+                        continue
+                    if saturated(first):
+                        print(f"范围 {cell_params['bounds']} 已达最小范围，结果可能不完整")
+                    for r in self.pages(cell_params, page_max, first):
+                        results.setdefault(r.get('uid') or id(r), r)
+                cells = next_cells
+        return list(results.values())
+
+    def search_many(self, queries, lat, lng, radius, page_max):
+        """同时检索多类地点，返回 {query: 结果列表}"""
+        with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+            futures = {query: executor.submit(self.search, query, lat, lng, radius, page_max) for query in queries}
+            return {query: future.result() for query, future in futures.items()}
+
+    def search_centres(self, queries, centres, page_max):
+        """
+        以多个检索中心 centres = [(纬度, 经度, 半径), ...] 检索各类地点，各中心并发检索，
+        相邻圆重叠部分的站点按 uid 去重（按中心的顺序保留第一次出现的结果），返回 {query: 结果列表}
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [(query, executor.submit(self.search, query, lat, lng, radius, page_max))
+                       for lat, lng, radius in centres for query in queries]
+            found = {query: {} for query in queries}
+            for query, future in futures:
+                for r in future.result():
+                    found[query].setdefault(r.get('uid') or id(r), r)
+        return {query: list(results.values()) for query, results in found.items()}
+
+
+def saturated(response):
+    """结果数达到上限，说明该范围内还有未返回的结果"""
+    return int(response.get('total') or 0) >= RESULT_CAP
+
+
+def split_cell(cell):
+    """把矩形范围 (南, 西, 北, 东) 四等分"""
+    south, west, north, east = cell
+    mid_lat, mid_lng = (south + north) / 2, (west + east) / 2
+    return [(south, west, mid_lat, mid_lng), (south, mid_lng, mid_lat, east),
+            (mid_lat, west, north, mid_lng), (mid_lat, mid_lng, north, east)]
+
+
+def distance(lng1, lat1, lng2, lat2):
+    """两点间的近似距离（米）"""
+    dx = (lng2 - lng1) * 111320 * math.cos(math.radians((lat1 + lat2) / 2))
+    dy = (lat2 - lat1) * 110540
+    return math.hypot(dx, dy)
+
+
+def cell_meets_circle(cell, circle):
+    """矩形范围与圆是否相交（圆心到矩形最近点的距离不超过半径）"""
+    south, west, north, east = cell
+    lat, lng, radius = circle
+    return distance(lng, lat, min(max(lng, west), east), min(max(lat, south), north)) <= radius
+
+
+def read_centres(path, radius):
+    """
+    读取检索中心文件，每行“经度,纬度”或“经度,纬度,半径”（BD09 坐标，与输入的经纬度格式相同），
+    未写半径的使用 radius；空行、# 开头的行和无法解析的行（如表头）跳过。返回 [(纬度, 经度, 半径), ...]
+    """
+    centres = []
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            parts = [p.strip() for p in line.replace('，', ',').split(',')]
+            if not line.strip() or line.lstrip().startswith('#'):
+                continue
+            try:
+                lng, lat = float(parts[0]), float(parts[1])
+                centres.append((lat, lng, int(float(parts[2])) if len(parts) > 2 and parts[2] else radius))
+            except (ValueError, IndexError):
+                print(f"跳过无法解析的行：{line.strip()}")
+    return centres
+
+
+def grid_centres(bounds, radius):
+    """
+    覆盖矩形范围 bounds = (南, 西, 北, 东)（BD09 纬度、经度）的检索中心网格。
+    中心间距为 √2 倍半径，相邻四个圆恰好覆盖它们之间的正方形，返回 [(纬度, 经度, 半径), ...]
+    """
+    south, west, north, east = bounds
+    step = radius * math.sqrt(2)
+    dlat = step / 110540
+    dlng = step / (111320 * math.cos(math.radians((south + north) / 2)))
+    rows = max(1, math.ceil((north - south) / dlat))
+    cols = max(1, math.ceil((east - west) / dlng))
+    # 网格整体居中，边缘的圆超出矩形的部分相同
+    lat0 = (south + north) / 2 - (rows - 1) * dlat / 2
+    lng0 = (west + east) / 2 - (cols - 1) * dlng / 2
+    return [(lat0 + i * dlat, lng0 + j * dlng, radius) for i in range(rows) for j in range(cols)]
+
+
+def save_results(results, prefix='bus_poi'):
+    """保存原始数据（prefix.json）和转换为 WGS84 坐标的 GeoJSON（prefix.geojson）"""
+    with open(f'{prefix}.json', 'w', encoding='utf-8') as file:
+        json.dump({"results": results}, file, ensure_ascii=False, indent=4)
+
+    # 创建 GeoJSON 的 FeatureCollection 结构
+    geojson = {
+        "type": "FeatureCollection",
+        "features": []
+    }
+    # 将百度坐标一次全部转换为 WGS84 坐标
+    wgs84_lng, wgs84_lat = coords.bd09_to_wgs84([r["location"]["lng"] for r in results],
+                                                [r["location"]["lat"] for r in results])
+    for result, lng, lat in zip(results, wgs84_lng.tolist(), wgs84_lat.tolist()):
+        geojson["features"].append({
+            "type": "Feature",
+            "geometry": {
+                "type": "Point",
+                "coordinates": [lng, lat]
+            },
+            "properties": {
+                "name": result["name"],
+                "address": result["address"],
+                "province": result["province"],
+                "city": result["city"],
+                "area": result["area"],
+                "uid": result["uid"]
+            }
+        })
+
+    with open(f'{prefix}.geojson', 'w', encoding='utf-8') as file:
+        json.dump(geojson, file, ensure_ascii=False, indent=4)
+
+
+def unique_lines(results):
+    """站点的 address 为经过该站的线路（以 ; 分隔），拆分、去重"""
+    lines = []
+    for result in results:
+        lines.extend(result.get('address', '').split(';'))
+    return [line for line in dict.fromkeys(lines) if line.strip()]
+
+
+def save_lines(city, line_names, cache_path=busdata_cache.CACHE_PATH):
+    """
+    读取线路信息（包含线路和站点），保存为 lines.geojson 和 stops.geojson。
+    已获取过的线路从本地缓存 cache_path 读取（见 busdata_cache.py），cache_path 为 None 时不使用缓存
+    """
+    if cache_path is None:
+        lines, stops = tbd.getbusdata(city, line_names)
+    else:
+        cache = busdata_cache.BusDataCache(cache_path)
+        lines, stops = cache.getbusdata(city, line_names)
+        print(f"线路数据：缓存读取 {cache.hits} 条，新获取 {cache.fetched} 条")
+    if lines.empty:
+        print("没有获取到线路数据")
+        return
+
+    # 为 GeoDataFrame 显式设置活动 geometry 列，并赋予 CRS
+    lines = lines.set_geometry('geometry')
+    lines.set_crs("EPSG:4326", inplace=True)
+    stops = stops.set_geometry('geometry')
+    stops.set_crs("EPSG:4326", inplace=True)
+
+    lines.to_file("lines.geojson", driver="GeoJSON")
+    stops.to_file("stops.geojson", driver="GeoJSON")
+
+
+def ask_search_params():
+    """依次输入 key、半径、经纬度和最大页数，返回 (PlaceSearch, 纬度, 经度, 半径, 最大页数)"""
+    keys = input("请输入百度key（多个key用英文逗号分隔）：")
+    radius = int(input('请输入半径，例如1000米，则输入1000即可：'))
+    location = input("请输出经纬度坐标：")
+    page_max = int(input(f"请输入最大页面（每页{PAGE_SIZE}条）："))
+    lng, lat = (float(v) for v in location.split(','))
+    return PlaceSearch(keys), lat, lng, radius, page_max
+
+
+if __name__ == '__main__':
+    # 一次获取公交站和地铁站
+    targets = {"公交车站": "bus_poi", "地铁站": "metro_poi"}
+    searcher, lat, lng, radius, page_max = ask_search_params()
+    found = searcher.search_many(list(targets), lat, lng, radius, page_max)
+
+    all_lines = []
+    for query, prefix in targets.items():
+        save_results(found[query], prefix)
+        lines = unique_lines(found[query])
+        all_lines += lines
+        print(f'目标点范围内共有 {len(found[query])} 个{query}和 {len(lines)} 条线路')
+        print([result["name"] for result in found[query]])
+        print(lines)
+    print(f"共请求 {searcher.calls} 次" + (f"，细分检索 {searcher.cells} 个范围" if searcher.cells else ''))
+
+    city = input('请确认项目所在的城市：')
+    save_lines(city, list(dict.fromkeys(all_lines)))
@@ -0,0 +1,57 @@
+"""
+对比 Guangzhou8684.py 各网页解析方式的速度，并检查解析结果是否与 html.parser 一致。
+默认读取 Guangzhou8684.py 网页缓存中保存的网页（page_cache/objects），也可以指定其他保存网页的文件夹：
+    python bench_parser.py [网页文件夹] [重复次数]
+"""
+import glob
+import os
+import sys
+import time
+
+from Guangzhou8684 import ROUTE_EXTRACTORS, parse_route_page
+
+
+def load_route_pages(folder):
+    """读取文件夹中的线路详细页面（能被 html.parser 正常解析的网页）"""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(folder, '**', '*.htm*'), recursive=True)):
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+        try:
+            pages.append((html, parse_route_page(html, 'html.parser')))
+        except Exception:
+            continue  # 分类页面或不完整的网页
+    return pages
+
+
+def bench(parser, pages, repeat):
+    """返回 (每秒解析网页数, 与 html.parser 结果不一致的网页数)"""
+    mismatched = sum(1 for html, expected in pages if parse_route_page(html, parser) != expected)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for html, _ in pages:
+            parse_route_page(html, parser)
+    elapsed = time.perf_counter() - start
+    return len(pages) * repeat / elapsed, mismatched
+
+
+if __name__ == '__main__':
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join('page_cache', 'objects')
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    pages = load_route_pages(folder)
+    if not pages:
+        print(f"{folder} 中没有可用的线路页面，请先运行 Guangzhou8684.py 或指定保存网页的文件夹")
+        sys.exit(1)
+
+    print(f"共 {len(pages)} 个线路页面，每种解析方式重复 {repeat} 次")
+    baseline = None
+    for parser in ROUTE_EXTRACTORS:
+        try:
+            speed, mismatched = bench(parser, pages, repeat)
+        except ImportError as e:
+            print(f"{parser:<12} 未安装，跳过（{e}）")
+            continue
+        baseline = baseline or speed
+        print(f"{parser:<12} {speed:10.1f} 页/秒  相对 html.parser {speed / baseline:5.2f} 倍  "
+              f"结果不一致 {mismatched} 页")
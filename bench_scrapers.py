@@ -0,0 +1,121 @@
+"""
+在本地回放服务（replay_server.py）上测试各爬虫的吞吐量，无需访问真实网站：
+- Guangzhou8684.crawl_city：分别以逐条抓取和并发抓取运行；
+- Busget 1.0.py、Metroget 1.0.py、baidu_station.py（一次获取两类站点）：百度地点检索的翻页；
+- POI爬取.py 功能3：按shp查询POI的矩形细分和翻页（请求数含翻页，不等于矩形数）。
+输出每项的耗时、页面/秒、请求/秒；以脚本运行的爬虫从回放服务收到首个请求起计时，到脚本结束为止。
+
+    python bench_scrapers.py [--latency 0.05] [--error-rate 0] [--only 8684,baidu,poi]
+"""
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import Guangzhou8684
+from replay_server import CENTER_LAT, CENTER_LNG, SPAN, ReplayServer
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def report(name, wall, pages, requests, note=''):
+    wall = max(wall, 1e-9)
+    print(f"{name:<28} 耗时 {wall:8.2f} 秒  {pages / wall:9.1f} 页/秒  {requests / wall:9.1f} 请求/秒  {note}")
+
+
+def script_wall(server):
+    """回放服务收到首个请求到脚本结束的时间（不计脚本启动、导入依赖的时间），需在 run_script 返回后立即调用"""
+    return time.perf_counter() - server.first_time
+
+
+def run_script(script, answers, env, cwd, timeout):
+    """以预先准备好的输入运行交互式脚本，返回 (退出码, 标准错误最后一行)"""
+    proc = subprocess.run([sys.executable, os.path.join(HERE, script)], input=answers, text=True,
+                          env={**os.environ, **env}, cwd=cwd, capture_output=True, timeout=timeout)
+    lines = [l for l in proc.stderr.strip().splitlines() if l.strip()]
+    return proc.returncode, (lines[-1] if lines else '')
+
+
+def bench_8684(server, workers_list):
+    base_url = server.bus8684_url.format(city='guangzhou')
+    for workers in workers_list:
+        server.reset_stats()
+        with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            written, failed = Guangzhou8684.crawl_city('guangzhou', tmp, base_url=base_url, max_workers=workers,
+                                                       delay=0, resume=False, cache_dir=None)
+            wall = time.perf_counter() - start
+        requests, _ = server.stats('8684')
+        report(f"8684 crawl_city 并发{workers}", wall, written, requests, f"线路 {written} 条，失败 {failed} 条")
+
+
+def bench_baidu(server, page_max, timeout):
+    # 依次回答：key、半径、经纬度、最大页数；之后的城市输入为空，脚本在获取线路数据前结束
+    answers = f"bench-ak\n3000\n{CENTER_LNG},{CENTER_LAT}\n{page_max}\n"
+    for script in ('Busget 1.0.py', 'Metroget 1.0.py', 'baidu_station.py'):
+        server.reset_stats()
+        with tempfile.TemporaryDirectory() as tmp:
+            code, error = run_script(script, answers, {'BAIDU_API': server.baidu_url}, tmp, timeout)
+            requests, _ = server.stats('baidu')
+            wall = script_wall(server) if requests else 0.0
+        if requests == 0:
+            print(f"{script:<28} 跳过：{error}")
+            continue
+        report(script, wall, requests, requests, f"共 {requests} 页")
+
+
+def bench_poi(server, timeout):
+    try:
+        import shapefile
+    except ImportError:
+        print(f"{'POI爬取.py 功能3':<28} 跳过：未安装 pyshp")
+        return
+    server.reset_stats()
+    with tempfile.TemporaryDirectory() as tmp:
+        # 以模拟 POI 的范围作为目标区域
+        with shapefile.Writer(os.path.join(tmp, '目标区域'), shapeType=shapefile.POLYGON) as shp:
+            shp.field('name', 'C')
+            shp.poly([[(CENTER_LNG - SPAN, CENTER_LAT - SPAN), (CENTER_LNG - SPAN, CENTER_LAT + SPAN),
+                       (CENTER_LNG + SPAN, CENTER_LAT + SPAN), (CENTER_LNG + SPAN, CENTER_LAT - SPAN),
+                       (CENTER_LNG - SPAN, CENTER_LAT - SPAN)]])
+            shp.record('bench')
+        # 依次回答：功能、key、关键词、类型、确认 shp、详细信息，最后的回车用于退出
+        answers = "3\nbench-key-1,bench-key-2\n\n\n\n1\n\n"
+        code, error = run_script('POI爬取.py', answers, {'AMAP_API': server.amap_url}, tmp, timeout)
+        requests, _ = server.stats('amap')
+        wall = script_wall(server) if requests else 0.0
+    if requests == 0:
+        print(f"{'POI爬取.py 功能3':<28} 跳过：{error}")
+        return
+    report('POI爬取.py 功能3', wall, requests, requests, f"共 {requests} 次请求（含翻页）" + (f"（{error}）" if code else ''))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='在本地回放服务上测试各爬虫的吞吐量')
+    parser.add_argument('--latency', type=float, default=0.05, help='每个请求的模拟网络延迟（秒）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='请求返回 HTTP 503 的概率')
+    parser.add_argument('--page-cache', default=None, help='使用 Guangzhou8684.py 网页缓存中的真实网页')
+    parser.add_argument('--routes', type=int, default=300, help='模拟线路数')
+    parser.add_argument('--stations', type=int, default=150, help='模拟百度公交站、地铁站数')
+    parser.add_argument('--pois', type=int, default=2000, help='模拟 POI 数')
+    parser.add_argument('--workers', default='1,8', help='8684 并发数，逗号分隔')
+    parser.add_argument('--page-max', type=int, default=20, help='Busget/Metroget 的最大页数')
+    parser.add_argument('--only', default='8684,baidu,poi', help='只测试其中几项，逗号分隔')
+    parser.add_argument('--timeout', type=float, default=600, help='每个脚本的最长运行时间（秒）')
+    args = parser.parse_args()
+
+    only = args.only.split(',')
+    with ReplayServer(page_cache_dir=args.page_cache, latency=args.latency, error_rate=args.error_rate,
+                      synthetic_routes=args.routes, synthetic_stations=args.stations,
+                      synthetic_pois=args.pois) as server:
+        print(f"回放服务：{server.base_url}，延迟 {args.latency} 秒，出错概率 {args.error_rate}")
+        if '8684' in only:
+            bench_8684(server, [int(w) for w in args.workers.split(',')])
+        if 'baidu' in only:
+            bench_baidu(server, args.page_max, args.timeout)
+        if 'poi' in only:
+            bench_poi(server, args.timeout)
@@ -0,0 +1,200 @@
+"""
+用 synthetic_bus.py 生成的模拟 bus.txt / bus.jsonl 测试 txtToxlxs.py 各环节的性能：
+parse_bus_data（单进程、多进程）、load_bus_records、process_time、generate_excel（普通、constant_memory）、
+stream_bus_excel（单进程、多进程）。每个环节在单独的进程中运行，输出耗时、线路/秒和峰值内存（RSS），
+并与 bench_golden.json 中的标准结果比对，解析结果有变化时报告“结果不一致”并以退出码 1 结束。
+
+    python bench_txtToxlxs.py [--routes 20000] [--seed 0] [--processes 4] [--only parse,excel] [--update-golden]
+
+修改解析逻辑且确认新结果正确后，用 --update-golden 更新标准结果。
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import pickle
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import txtToxlxs
+from synthetic_bus import write_synthetic_bus
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_FILE = os.path.join(HERE, 'bench_golden.json')
+
+
+def peak_rss_mb():
+    """当前进程的峰值内存（MB），不支持的系统返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def frames_digest(forward_df, reverse_df):
+    """两张表内容的摘要，用于与标准结果比对"""
+    h = hashlib.sha256()
+    for df in (forward_df, reverse_df):
+        h.update(df.reindex(columns=txtToxlxs.COLUMNS).to_csv(index=False, float_format='%.6f').encode('utf-8'))
+    return h.hexdigest()
+
+
+def excel_digest(path):
+    sheets = pd.read_excel(path, sheet_name=['正向线路', '反向线路'], dtype={'首班车': str, '末班车': str})
+    return frames_digest(sheets['正向线路'], sheets['反向线路'])
+
+
+# ------------------- 各环节（在子进程中运行） -------------------
+# 每个环节先完成准备工作，再用 measure 计时运行，返回 (耗时, 结果摘要, 准备后的峰值内存, 结束时的峰值内存)
+
+def measure(func, *args):
+    """运行 func，返回 (返回值, 耗时, 运行前的峰值内存, 运行后的峰值内存)"""
+    setup_peak = peak_rss_mb()
+    start = time.perf_counter()
+    result = func(*args)
+    wall = time.perf_counter() - start
+    return result, wall, setup_peak, peak_rss_mb()
+
+
+def stage_parse(paths, processes=1):
+    frames, *stats = measure(txtToxlxs.parse_bus_data, paths['txt'], processes)
+    if processes == 1:
+        with open(paths['frames'], 'wb') as f:
+            pickle.dump(frames, f)
+    return stats[0], frames_digest(*frames), *stats[1:]
+
+
+def stage_records(paths):
+    frames, *stats = measure(txtToxlxs.load_bus_records, paths['jsonl'])
+    return stats[0], frames_digest(*frames), *stats[1:]
+
+
+def stage_process_time(paths):
+    with open(paths['jsonl'], 'r', encoding='utf-8') as f:
+        time_strs = [part for line in f for part in json.loads(line)['time'].split('|')]
+    txtToxlxs.process_time.cache_clear()
+    results, *stats = measure(lambda: [txtToxlxs.process_time(s) for s in time_strs])
+    return stats[0], hashlib.sha256(json.dumps(results, ensure_ascii=False).encode('utf-8')).hexdigest(), *stats[1:]
+
+
+def stage_excel(paths, constant_memory=False):
+    with open(paths['frames'], 'rb') as f:
+        forward_df, reverse_df = pickle.load(f)
+    _, *stats = measure(txtToxlxs.generate_excel, paths['xlsx'], forward_df, reverse_df, constant_memory)
+    return stats[0], None, *stats[1:]
+
+
+def stage_stream(paths, processes=1):
+    _, *stats = measure(txtToxlxs.stream_bus_excel, paths['txt'], paths['xlsx'], processes)
+    return stats[0], None, *stats[1:]
+
+
+def in_subprocess(stage, paths, *args):
+    """在新的子进程中运行一个环节，使各环节的峰值内存互不影响（以“本环节增加”的内存为准）"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context()) as executor:
+        return executor.submit(stage, paths, *args).result()
+
+
+def report(name, n_routes, wall, setup_peak, end_peak, check):
+    wall = max(wall, 1e-9)
+    memory = '峰值内存 -' if end_peak is None else \
+        f"峰值内存 {end_peak:7.1f} MB（本环节增加 {end_peak - setup_peak:6.1f} MB）"
+    print(f"{name:<34} 耗时 {wall:7.2f} 秒  {n_routes / wall:9.1f} 线路/秒  {memory}  {check}")
+
+
+def load_golden():
+    if not os.path.exists(GOLDEN_FILE):
+        return {}
+    with open(GOLDEN_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='测试 txtToxlxs.py 各环节的性能')
+    parser.add_argument('--routes', type=int, default=20000, help='模拟线路数')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    parser.add_argument('--processes', type=int, default=4, help='多进程解析的进程数，1 表示不测试多进程解析')
+    parser.add_argument('--only', default='parse,records,time,excel,stream', help='只测试其中几项，逗号分隔')
+    parser.add_argument('--update-golden', action='store_true', help='把本次结果保存为标准结果')
+    args = parser.parse_args()
+
+    only = args.only.split(',')
+    golden_all = load_golden()
+    key = f"{args.routes}:{args.seed}"
+    golden = golden_all.get(key, {})
+    results = {}
+    failed = []
+
+    def check(name, digest):
+        """与标准结果比对，返回说明文字"""
+        results[name] = digest
+        if name not in golden:
+            return '（无标准结果）'
+        if golden[name] != digest:
+            failed.append(name)
+            return '结果不一致！'
+        return '结果一致'
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {name: os.path.join(tmp, f'bus.{name}') for name in ('txt', 'jsonl', 'frames', 'xlsx')}
+        start = time.perf_counter()
+        write_synthetic_bus(paths['txt'], args.routes, args.seed, paths['jsonl'])
+        print(f"生成 {args.routes} 条模拟线路（随机种子 {args.seed}），bus.txt {os.path.getsize(paths['txt']) / 2 ** 20:.1f} MB，"
+              f"用时 {time.perf_counter() - start:.1f} 秒")
+
+        # 生成 Excel 的环节需要单进程解析的结果
+        if 'parse' in only or 'excel' in only:
+            wall, digest, setup_peak, end_peak = in_subprocess(stage_parse, paths)
+            report('parse_bus_data', args.routes, wall, setup_peak, end_peak, check('parse_bus_data', digest))
+            if 'parse' in only and args.processes > 1:
+                wall, digest, setup_peak, end_peak = in_subprocess(stage_parse, paths, args.processes)
+                same = '与单进程一致' if digest == results['parse_bus_data'] else '与单进程不一致！'
+                if digest != results['parse_bus_data']:
+                    failed.append(f'parse_bus_data {args.processes}进程')
+                report(f'parse_bus_data {args.processes}进程', args.routes, wall, setup_peak, end_peak, same)
+        if 'records' in only:
+            wall, digest, setup_peak, end_peak = in_subprocess(stage_records, paths)
+            report('load_bus_records', args.routes, wall, setup_peak, end_peak, check('load_bus_records', digest))
+        if 'time' in only:
+            wall, digest, setup_peak, end_peak = in_subprocess(stage_process_time, paths)
+            report('process_time', args.routes, wall, setup_peak, end_peak, check('process_time', digest))
+
+        # 生成的 Excel 读回后应与解析结果相同
+        expected = results.get('parse_bus_data')
+        stages = []
+        if 'excel' in only:
+            stages += [('generate_excel', stage_excel, ()), ('generate_excel constant_memory', stage_excel, (True,))]
+        if 'stream' in only:
+            stages += [('stream_bus_excel', stage_stream, ())]
+            # 多进程解析时流式写入的内存同样不应随线路数增长
+            if args.processes > 1:
+                stages += [(f'stream_bus_excel {args.processes}进程', stage_stream, (args.processes,))]
+        for name, stage, stage_args in stages:
+            wall, _, setup_peak, end_peak = in_subprocess(stage, paths, *stage_args)
+            if expected is None:
+                note = ''
+            elif excel_digest(paths['xlsx']) == expected:
+                note = '与解析结果一致'
+            else:
+                failed.append(name)
+                note = '与解析结果不一致！'
+            report(name, args.routes, wall, setup_peak, end_peak, note)
+
+    if args.update_golden:
+        golden_all[key] = {**golden, **results}
+        with open(GOLDEN_FILE, 'w', encoding='utf-8') as f:
+            json.dump(golden_all, f, ensure_ascii=False, indent=2, sort_keys=True)
+        print(f"标准结果已保存至 {GOLDEN_FILE}")
+    elif failed:
+        print(f"以下环节的结果与标准结果不一致：{'、'.join(failed)}")
+        sys.exit(1)
@@ -0,0 +1,108 @@
+# encoding:utf-8
+"""
+tbd.getbusdata 的本地缓存：按 (城市, 线路名称) 把线路和站点的几何保存在 SQLite 数据库中，
+再次查询同一条线路时直接读取，只有缓存中没有或已超过有效期的线路才重新获取。
+相邻研究范围的线路大多相同，重复运行时几乎不再请求百度地图。
+
+    lines, stops = busdata_cache.getbusdata('广州', ['番12路', '南沙8路'])
+
+返回值与 tbd.getbusdata 相同（WGS84 坐标的线路 GeoDataFrame 和站点 GeoDataFrame）。
+百度地图上查不到的线路同样缓存，但有效期较短（EMPTY_TTL_DAYS），以免因临时的网络问题长期缺失。
+"""
+import json
+import sqlite3
+import time
+
+import geopandas as gpd
+import pandas as pd
+import transbigdata as tbd
+from shapely import wkt
+
+CACHE_PATH = "busdata_cache.sqlite"
+TTL_DAYS = 30  # 缓存有效期（天）
+EMPTY_TTL_DAYS = 1  # 查不到的线路的缓存有效期（天）
+
+LINE_COLUMNS = ['linename', 'geometry', 'city', 'line']
+STOP_COLUMNS = ['stationnames', 'linename', 'lon', 'lat', 'geometry', 'line', 'id']
+
+
+class BusDataCache:
+    def __init__(self, path=CACHE_PATH, ttl_days=TTL_DAYS, empty_ttl_days=EMPTY_TTL_DAYS):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.empty_ttl = empty_ttl_days * 86400
+        self.hits = 0
+        self.fetched = 0
+        with self.connect() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS busdata (
+                                city TEXT, keyword TEXT, fetched_at REAL, lines TEXT, stops TEXT,
+                                PRIMARY KEY (city, keyword))""")
+
+    def connect(self):
+        return sqlite3.connect(self.path)
+
+    def load(self, city, keywords, now=None):
+        """读取未过期的缓存，返回 {线路名称: (线路记录, 站点记录)}"""
+        now = time.time() if now is None else now
+        found = {}
+        with self.connect() as conn:
+            for keyword in keywords:
+                row = conn.execute("SELECT fetched_at, lines, stops FROM busdata WHERE city = ? AND keyword = ?",
+                                   (city, keyword)).fetchone()
+                if row is None:
+                    continue
+                fetched_at, lines, stops = row[0], json.loads(row[1]), json.loads(row[2])
+                if now - fetched_at <= (self.ttl if lines else self.empty_ttl):
+                    found[keyword] = (lines, stops)
+        return found
+
+    def store(self, city, keyword, lines, stops):
+        """保存一条线路的查询结果，lines、stops 为 tbd.getbusdata 的返回值（可以为空）"""
+        line_records = [] if lines.empty else \
+            [{'linename': r.linename, 'wkt': r.geometry.wkt} for r in lines.itertuples()]
+        stop_records = [] if stops.empty else \
+            stops[['stationnames', 'linename', 'lon', 'lat', 'id']].to_dict('records')
+        with self.connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO busdata VALUES (?, ?, ?, ?, ?)",
+                         (city, keyword, time.time(), json.dumps(line_records, ensure_ascii=False),
+                          json.dumps(stop_records, ensure_ascii=False)))
+        return line_records, stop_records
+
+    def getbusdata(self, city, keywords):
+        """与 tbd.getbusdata(city, keywords) 相同，缓存中没有或已过期的线路逐条获取后写入缓存"""
+        keywords = list(dict.fromkeys(str(k) for k in keywords))
+        found = self.load(city, keywords)
+        self.hits += len(found)
+        missing = [k for k in keywords if k not in found]
+        if missing:
+            print(f"缓存命中 {len(found)} 条线路，需要获取 {len(missing)} 条")
+        for keyword in missing:
+            lines, stops = tbd.getbusdata(city, [keyword])
+            found[keyword] = self.store(city, keyword, lines, stops)
+            self.fetched += 1
+        return to_frames(city, [found[k] for k in keywords])
+
+
+def to_frames(city, results):
+    """把缓存记录合并为与 tbd.getbusdata 返回值相同的线路、站点 GeoDataFrame"""
+    line_records = [r for lines, _ in results for r in lines]
+    stop_records = [r for _, stops in results for r in stops]
+    if not line_records:
+        return gpd.GeoDataFrame(), gpd.GeoDataFrame()
+
+    lines = pd.DataFrame(line_records)
+    lines = gpd.GeoDataFrame({'linename': lines['linename'], 'geometry': lines['wkt'].apply(wkt.loads),
+                              'city': city}, geometry='geometry', crs="EPSG:4326")
+    lines['line'] = lines['linename'].str.split('(').str[0]
+
+    stops = pd.DataFrame(stop_records, columns=['stationnames', 'linename', 'lon', 'lat', 'id'])
+    stops = gpd.GeoDataFrame(stops, geometry=gpd.points_from_xy(stops['lon'], stops['lat']), crs="EPSG:4326")
+    stops['line'] = stops['linename'].str.split('(').str[0]
+    # 不同关键词可能查到同一条线路，与 tbd.getbusdata 一样按线路去重
+    lines = lines.drop_duplicates(subset=['linename'], ignore_index=True)
+    stops = stops.drop_duplicates(subset=['linename', 'stationnames'], ignore_index=True)
+    return lines[LINE_COLUMNS], stops[STOP_COLUMNS]
+
+
+def getbusdata(city, keywords, path=CACHE_PATH, ttl_days=TTL_DAYS):
+    return BusDataCache(path, ttl_days).getbusdata(city, keywords)
@@ -0,0 +1,174 @@
+"""
+BD09（百度）、GCJ02（高德）与 WGS84 坐标的相互转换。
+与 transbigdata 的公式相同，但整列一次计算：输入可以是单个数值、列表、NumPy 数组或 pandas Series
+（Decimal、数字字符串均可），返回相同形式的结果；无效的坐标返回 NaN。
+
+    lng, lat = coords.bd09_to_wgs84(df['lng'], df['lat'])
+    df = coords.add_wgs84_columns(df, '坐标', 'gcj02')     # “经度,纬度”字符串列
+
+直接运行时与 transbigdata 的逐点转换结果比对，并测试 10 万个坐标的转换耗时：python coords.py
+"""
+import numpy as np
+import pandas as pd
+
+X_PI = 3.14159265358979324 * 3000.0 / 180.0
+PI = 3.1415926535897932384626
+A = 6378245.0
+EE = 0.00669342162296594323
+
+# add_wgs84_columns 增加的列名
+WGS84_COLUMNS = ('WGS84经度', 'WGS84纬度')
+
+
+def _as_float(values):
+    """转换为浮点数组，无法转换的值为 NaN"""
+    if np.isscalar(values) or values is None:
+        try:
+            return np.float64(values)
+        except (TypeError, ValueError):
+            return np.float64(np.nan)
+    array = np.asarray(values)
+    if array.dtype.kind in 'fiu':
+        return array.astype(float, copy=False)
+    return pd.to_numeric(pd.Series(np.asarray(values, dtype=object).ravel()), errors='coerce').to_numpy(float)
+
+
+def _like(template, values):
+    """按输入的形式返回结果：Series 保留索引，标量返回 float"""
+    if isinstance(template, pd.Series):
+        return pd.Series(values, index=template.index)
+    if np.ndim(values) == 0:
+        return float(values)
+    return values
+
+
+def _vectorized(func):
+    def wrapper(lng, lat):
+        out_lng, out_lat = func(_as_float(lng), _as_float(lat))
+        return _like(lng, out_lng), _like(lat, out_lat)
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+
+def _transform_lat(lng, lat):
+    ret = -100.0 + 2.0 * lng + 3.0 * lat + 0.2 * lat * lat + 0.1 * lng * lat + 0.2 * np.sqrt(np.fabs(lng))
+    ret += (20.0 * np.sin(6.0 * lng * PI) + 20.0 * np.sin(2.0 * lng * PI)) * 2.0 / 3.0
+    ret += (20.0 * np.sin(lat * PI) + 40.0 * np.sin(lat / 3.0 * PI)) * 2.0 / 3.0
+    ret += (160.0 * np.sin(lat / 12.0 * PI) + 320 * np.sin(lat * PI / 30.0)) * 2.0 / 3.0
+    return ret
+
+
+def _transform_lng(lng, lat):
+    ret = 300.0 + lng + 2.0 * lat + 0.1 * lng * lng + 0.1 * lng * lat + 0.1 * np.sqrt(np.fabs(lng))
+    ret += (20.0 * np.sin(6.0 * lng * PI) + 20.0 * np.sin(2.0 * lng * PI)) * 2.0 / 3.0
+    ret += (20.0 * np.sin(lng * PI) + 40.0 * np.sin(lng / 3.0 * PI)) * 2.0 / 3.0
+    ret += (150.0 * np.sin(lng / 12.0 * PI) + 300.0 * np.sin(lng / 30.0 * PI)) * 2.0 / 3.0
+    return ret
+
+
+def _gcj02_offset(lng, lat):
+    """WGS84 到 GCJ02 的偏移量"""
+    dlat = _transform_lat(lng - 105.0, lat - 35.0)
+    dlng = _transform_lng(lng - 105.0, lat - 35.0)
+    radlat = lat / 180.0 * PI
+    magic = 1 - EE * np.sin(radlat) ** 2
+    sqrtmagic = np.sqrt(magic)
+    dlat = (dlat * 180.0) / ((A * (1 - EE)) / (magic * sqrtmagic) * PI)
+    dlng = (dlng * 180.0) / (A / sqrtmagic * np.cos(radlat) * PI)
+    return dlng, dlat
+
+
+@_vectorized
+def gcj02_to_bd09(lng, lat):
+    z = np.sqrt(lng * lng + lat * lat) + 0.00002 * np.sin(lat * X_PI)
+    theta = np.arctan2(lat, lng) + 0.000003 * np.cos(lng * X_PI)
+    return z * np.cos(theta) + 0.0065, z * np.sin(theta) + 0.006
+
+
+@_vectorized
+def bd09_to_gcj02(lng, lat):
+    x, y = lng - 0.0065, lat - 0.006
+    z = np.sqrt(x * x + y * y) - 0.00002 * np.sin(y * X_PI)
+    theta = np.arctan2(y, x) - 0.000003 * np.cos(x * X_PI)
+    return z * np.cos(theta), z * np.sin(theta)
+
+
+@_vectorized
+def wgs84_to_gcj02(lng, lat):
+    dlng, dlat = _gcj02_offset(lng, lat)
+    return lng + dlng, lat + dlat
+
+
+@_vectorized
+def gcj02_to_wgs84(lng, lat):
+    dlng, dlat = _gcj02_offset(lng, lat)
+    return lng - dlng, lat - dlat
+
+
+def bd09_to_wgs84(lng, lat):
+    return gcj02_to_wgs84(*bd09_to_gcj02(lng, lat))
+
+
+def wgs84_to_bd09(lng, lat):
+    return gcj02_to_bd09(*wgs84_to_gcj02(lng, lat))
+
+
+CONVERTERS = {
+    ('bd09', 'gcj02'): bd09_to_gcj02,
+    ('gcj02', 'bd09'): gcj02_to_bd09,
+    ('wgs84', 'gcj02'): wgs84_to_gcj02,
+    ('gcj02', 'wgs84'): gcj02_to_wgs84,
+    ('bd09', 'wgs84'): bd09_to_wgs84,
+    ('wgs84', 'bd09'): wgs84_to_bd09,
+}
+
+
+def convert(lng, lat, src, dst):
+    """src、dst 为 'bd09'、'gcj02' 或 'wgs84'"""
+    src, dst = src.lower(), dst.lower()
+    if src == dst:
+        return _like(lng, _as_float(lng)), _like(lat, _as_float(lat))
+    if (src, dst) not in CONVERTERS:
+        raise ValueError(f"不支持的坐标转换：{src} → {dst}")
+    return CONVERTERS[(src, dst)](lng, lat)
+
+
+def split_location(locations):
+    """把“经度,纬度”字符串列拆分为经度、纬度两列浮点数，格式不正确的为 NaN"""
+    parts = pd.Series(locations).astype(str).str.split(',', n=1, expand=True).reindex(columns=[0, 1])
+    return pd.to_numeric(parts[0].str.strip(), errors='coerce'), pd.to_numeric(parts[1].str.strip(), errors='coerce')
+
+
+def convert_columns(df, lng_col, lat_col, src, dst='wgs84', out_cols=WGS84_COLUMNS):
+    """转换 df 的经度、纬度列，结果写入 out_cols 两列，返回 df"""
+    df[out_cols[0]], df[out_cols[1]] = convert(df[lng_col], df[lat_col], src, dst)
+    return df
+
+
+def add_wgs84_columns(df, location_col, src='gcj02', out_cols=WGS84_COLUMNS):
+    """由“经度,纬度”字符串列计算 WGS84 坐标，增加 out_cols 两列，返回 df"""
+    if location_col not in df.columns:
+        return df
+    lng, lat = split_location(df[location_col])
+    df[out_cols[0]], df[out_cols[1]] = convert(lng, lat, src, 'wgs84')
+    return df
+
+
+if __name__ == '__main__':
+    import time
+    import transbigdata as tbd
+
+    rng = np.random.default_rng(0)
+    lng = rng.uniform(73, 135, 100000)
+    lat = rng.uniform(18, 53, 100000)
+    checks = [(bd09_to_wgs84, tbd.bd09towgs84), (gcj02_to_wgs84, tbd.gcj02towgs84),
+              (wgs84_to_gcj02, tbd.wgs84togcj02), (bd09_to_gcj02, tbd.bd09togcj02),
+              (gcj02_to_bd09, tbd.gcj02tobd09), (wgs84_to_bd09, tbd.wgs84tobd09)]
+    for func, reference in checks:
+        start = time.perf_counter()
+        out_lng, out_lat = func(lng, lat)
+        elapsed = time.perf_counter() - start
+        expected = np.array([reference(x, y) for x, y in zip(lng[:2000], lat[:2000])])
+        error = max(np.abs(out_lng[:2000] - expected[:, 0]).max(), np.abs(out_lat[:2000] - expected[:, 1]).max())
+        print(f"{func.__name__:<16} 10 万个坐标耗时 {elapsed * 1000:7.1f} 毫秒，与 transbigdata 逐点结果最大相差 {error:.2e} 度")
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class PageCache:
+    """
+    网页的本地缓存，供 Guangzhou8684.py 使用：
+    - objects/ 下按内容的 sha256 保存网页原文，内容相同的网页只保存一份；
+    - index.sqlite 记录每个 URL 最近一次的内容摘要以及 ETag / Last-Modified，
+      下次请求时带上 If-None-Match / If-Modified-Since，服务器返回 304 时直接读取缓存；
+    - parsed/ 下按内容摘要保存解析结果，网页内容未变化时无需再次解析。
+    """
+
+    def __init__(self, cache_dir='page_cache'):
+        self.cache_dir = cache_dir
+        os.makedirs(os.path.join(cache_dir, 'objects'), exist_ok=True)
+        os.makedirs(os.path.join(cache_dir, 'parsed'), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'), check_same_thread=False)
+        self._db.execute("""CREATE TABLE IF NOT EXISTS pages (
+                                url TEXT PRIMARY KEY,
+                                digest TEXT NOT NULL,
+                                etag TEXT,
+                                last_modified TEXT,
+                                fetched_at REAL)""")
+        self._db.commit()
+        # 本次运行的统计：未变化（304 或内容摘要相同）/ 新增或已变化 的网页数
+        self.unchanged = 0
+        self.changed = 0
+
+    def _object_path(self, digest):
+        return os.path.join(self.cache_dir, 'objects', digest[:2], digest + '.html')
+
+    def _parsed_path(self, digest):
+        return os.path.join(self.cache_dir, 'parsed', digest + '.json')
+
+    def _lookup(self, url):
+        with self._lock:
+            return self._db.execute("SELECT digest, etag, last_modified FROM pages WHERE url = ?",
+                                    (url,)).fetchone()
+
+    def conditional_headers(self, url):
+        """返回条件请求需要附加的请求头"""
+        row = self._lookup(url)
+        headers = {}
+        if row and os.path.exists(self._object_path(row[0])):
+            if row[1]:
+                headers['If-None-Match'] = row[1]
+            if row[2]:
+                headers['If-Modified-Since'] = row[2]
+        return headers
+
+    def load(self, url):
+        """服务器返回 304 时读取缓存的网页，返回 (网页原文, 内容摘要)"""
+        digest = self._lookup(url)[0]
+        with open(self._object_path(digest), 'r', encoding='utf-8') as f:
+            text = f.read()
+        with self._lock:
+            self.unchanged += 1
+        return text, digest
+
+    def store(self, url, text, etag=None, last_modified=None):
+        """保存新下载的网页，返回内容摘要"""
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write_atomic(path, text)
+        row = self._lookup(url)
+        with self._lock:
+            if row and row[0] == digest:
+                self.unchanged += 1
+            else:
+                self.changed += 1
+            self._db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                             (url, digest, etag, last_modified, time.time()))
+            self._db.commit()
+        return digest
+
+    def load_parsed(self, digest):
+        path = self._parsed_path(digest)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def store_parsed(self, digest, result):
+        _write_atomic(self._parsed_path(digest), json.dumps(result, ensure_ascii=False))
+
+    def close(self):
+        self._db.close()
+
+
+def _write_atomic(path, text):
+    """先写临时文件再替换，避免中断时留下不完整的缓存文件"""
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
@@ -0,0 +1,372 @@
+"""
+本地回放服务：在不访问真实网站的情况下运行、调试各爬虫并测试性能。
+
+- /8684/<城市拼音>/...  8684 公交网页面。优先使用 Guangzhou8684.py 网页缓存（page_cache）中保存的真实网页，
+                        没有缓存时生成模拟的线路分类页面和线路详细页面；
+- /baidu/place/v2/search   百度地点检索（Busget/Metroget 使用），支持圆形（location、radius）和矩形（bounds）范围，
+                           与百度相同，每次检索最多返回 BAIDU_RESULT_CAP 条结果；
+- /amap/v5/place/polygon、/amap/v5/place/around、/amap/v3/geocode/geo   高德接口（POI爬取.py 使用）。
+
+百度、高德接口优先返回 fixtures 文件夹中保存的响应（fixtures/baidu/*.json、fixtures/amap/*.json，
+每个文件为 {"path": 接口路径, "params": 请求参数, "response": 响应}，参数中不含 ak/key），
+没有对应文件时根据随机生成的站点、POI 计算响应，结果随请求的范围和页码变化。
+
+可设置每个请求的延迟（latency，秒）和出错概率（error_rate，返回 HTTP 503），
+以及每个高德 key 的可用次数（amap_quota，超出后返回 infocode 10003）。
+
+各爬虫通过以下方式指向回放服务：
+    Guangzhou8684.BASE_URL = server.bus8684_url          （或 crawl_city 的 base_url 参数）
+    环境变量 BAIDU_API=server.baidu_url                  （Busget 1.0.py、Metroget 1.0.py）
+    环境变量 AMAP_API=server.amap_url                    （POI爬取.py）
+
+直接运行时在前台提供服务：python replay_server.py [端口] [page_cache 文件夹]
+"""
+import glob
+import json
+import math
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+# 模拟数据的范围：南沙区明珠湾附近（GCJ02 / BD09 差异对回放没有影响）
+CENTER_LNG, CENTER_LAT = 113.55, 22.79
+SPAN = 0.15
+# 百度地点检索单次最多返回的结果数
+BAIDU_RESULT_CAP = 150
+
+
+class ReplayServer:
+    def __init__(self, port=0, page_cache_dir=None, fixtures_dir='fixtures', latency=0.0, error_rate=0.0,
+                 amap_quota=None, synthetic_routes=300, synthetic_stations=150, synthetic_pois=2000, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.amap_quota = amap_quota
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.pages = load_cached_pages(page_cache_dir) if page_cache_dir else {}
+        self.synthetic_pages = synthetic_8684_pages(synthetic_routes, seed)
+        self.fixtures = load_fixtures(fixtures_dir)
+        self.stations = synthetic_stations_data(synthetic_stations, seed)
+        self.pois = synthetic_pois_data(synthetic_pois, seed)
+        self.key_calls = {}
+        self.reset_stats()
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self.bus8684_url = self.base_url + '/8684/{city}'
+        self.baidu_url = self.base_url + '/baidu'
+        self.amap_url = self.base_url + '/amap'
+        self._thread = None
+
+    # ------------------- 统计 -------------------
+    def reset_stats(self):
+        with self._lock:
+            self.requests = {}
+            self.errors = 0
+            self.first_time = None
+            self.last_time = None
+
+    def stats(self, prefix=''):
+        """返回 (请求数, 首个请求到最后一个请求的时间)，prefix 为 '8684'、'baidu' 或 'amap' 时只统计该类请求"""
+        with self._lock:
+            count = sum(n for k, n in self.requests.items() if k.startswith(prefix))
+            span = (self.last_time - self.first_time) if self.first_time is not None else 0.0
+        return count, span
+
+    # ------------------- 服务 -------------------
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle(self, request):
+        url = urlparse(request.path)
+        parts = url.path.strip('/').split('/')
+        kind = parts[0] if parts else ''
+        now = time.perf_counter()
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+            self.first_time = now if self.first_time is None else self.first_time
+            self.last_time = now
+            fail = self._random.random() < self.error_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            with self._lock:
+                self.errors += 1
+            return send(request, 503, b'Service Unavailable', 'text/plain')
+
+        params = dict(parse_qsl(url.query, keep_blank_values=True))
+        if kind == '8684' and len(parts) >= 2:
+            return self.serve_8684(request, parts[1], '/' + '/'.join(parts[2:]))
+        if kind == 'baidu':
+            return send_json(request, self.serve_baidu('/' + '/'.join(parts[1:]), params))
+        if kind == 'amap':
+            return send_json(request, self.serve_amap('/' + '/'.join(parts[1:]), params))
+        send(request, 404, b'Not Found', 'text/plain')
+
+    def serve_8684(self, request, city, path):
+        html = self.pages.get((city, path))
+        if html is None:
+            html = self.synthetic_pages.get(path)
+        if html is None:
+            return send(request, 404, b'Not Found', 'text/plain')
+        send(request, 200, html.encode('utf-8'), 'text/html; charset=utf-8')
+
+    def fixture(self, api, path, params):
+        query = {k: v for k, v in params.items() if k not in ('ak', 'key', 'parameters')}
+        for fixture in self.fixtures.get(api, []):
+            if fixture['path'] == path and fixture['params'] == query:
+                return fixture['response']
+        return None
+
+    def serve_baidu(self, path, params):
+        response = self.fixture('baidu', path, params)
+        if response is not None:
+            return response
+        query = params.get('query', '')
+        if 'bounds' in params:
+            south, west, north, east = (float(v) for v in params['bounds'].split(','))
+            hits = [s for s in self.stations if s['query'] == query
+                    and south <= s['location']['lat'] <= north and west <= s['location']['lng'] <= east]
+        else:
+            lat, lng = (float(v) for v in params.get('location', f'{CENTER_LAT},{CENTER_LNG}').split(','))
+            radius = float(params.get('radius', 1000))
+            hits = [s for s in self.stations if s['query'] == query
+                    and distance(lng, lat, s['location']['lng'], s['location']['lat']) <= radius]
+        # 与百度相同，每次检索最多返回 BAIDU_RESULT_CAP 条结果
+        hits = hits[:BAIDU_RESULT_CAP]
+        page_size = int(params.get('page_size', 10))
+        page_num = int(params.get('page_num', 0))
+        results = [{k: v for k, v in s.items() if k != 'query'}
+                   for s in hits[page_num * page_size:(page_num + 1) * page_size]]
+        return {'status': 0, 'message': 'ok', 'result_type': 'poi_type', 'total': len(hits), 'results': results}
+
+    def serve_amap(self, path, params):
+        key = params.get('key', '')
+        with self._lock:
+            self.key_calls[key] = self.key_calls.get(key, 0) + 1
+            exhausted = self.amap_quota is not None and self.key_calls[key] > self.amap_quota
+        if exhausted:
+            return {'status': '0', 'info': 'DAILY_QUERY_OVER_LIMIT', 'infocode': '10003'}
+        response = self.fixture('amap', path, params)
+        if response is not None:
+            return response
+        if path == '/v3/geocode/geo':
+            return {'status': '1', 'info': 'OK', 'infocode': '10000', 'count': '1',
+                    'geocodes': [{'formatted_address': params.get('address', ''), 'level': '兴趣点',
+                                  'location': f'{CENTER_LNG:.6f},{CENTER_LAT:.6f}',
+                                  'city': '广州市', 'district': '南沙区'}]}
+        if path == '/v5/place/polygon':
+            points = [tuple(map(float, p.split(','))) for p in params.get('polygon', '').split('|') if p]
+            if len(points) == 2:
+                (ax, ay), (bx, by) = points
+                points = [(ax, ay), (bx, ay), (bx, by), (ax, by)]
+            hits = [p for p in self.pois if in_polygon(p['_xy'], points)]
+        elif path == '/v5/place/around':
+            lng, lat = (float(v) for v in params.get('location', f'{CENTER_LNG},{CENTER_LAT}').split(','))
+            radius = float(params.get('radius') or 5000)
+            hits = [p for p in self.pois if distance(lng, lat, *p['_xy']) <= radius]
+        else:
+            return {'status': '0', 'info': 'INVALID_REQUEST', 'infocode': '20000'}
+        page_size = int(params.get('page_size') or 10)
+        page_num = int(params.get('page_num') or 1)
+        pois = [{k: v for k, v in p.items() if k != '_xy'}
+                for p in hits[(page_num - 1) * page_size:page_num * page_size]]
+        return {'status': '1', 'info': 'OK', 'infocode': '10000', 'count': str(len(pois)), 'pois': pois}
+
+
+def send(request, status, body, content_type):
+    request.send_response(status)
+    request.send_header('Content-Type', content_type)
+    request.send_header('Content-Length', str(len(body)))
+    request.end_headers()
+    request.wfile.write(body)
+
+
+def send_json(request, data):
+    send(request, 200, json.dumps(data, ensure_ascii=False).encode('utf-8'), 'application/json; charset=utf-8')
+
+
+# ------------------- 数据 -------------------
+
+def load_cached_pages(cache_dir):
+    """读取 Guangzhou8684.py 的网页缓存，返回 {(城市拼音, 路径): 网页}"""
+    pages = {}
+    for index in glob.glob(os.path.join(cache_dir, '**', 'index.sqlite'), recursive=True):
+        folder = os.path.dirname(index)
+        db = sqlite3.connect(index)
+        for url, digest in db.execute("SELECT url, digest FROM pages"):
+            parsed = urlparse(url)
+            path = os.path.join(folder, 'objects', digest[:2], digest + '.html')
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    pages[(parsed.netloc.split('.')[0], parsed.path or '/')] = f.read()
+        db.close()
+    return pages
+
+
+def load_fixtures(fixtures_dir):
+    fixtures = {}
+    if not fixtures_dir:
+        return fixtures
+    for api in ('baidu', 'amap'):
+        for path in sorted(glob.glob(os.path.join(fixtures_dir, api, '*.json'))):
+            with open(path, 'r', encoding='utf-8') as f:
+                fixtures.setdefault(api, []).append(json.load(f))
+    return fixtures
+
+
+def synthetic_8684_pages(n_routes, seed=0):
+    """生成与 8684 结构相同的首页、线路分类页面和线路详细页面，返回 {路径: 网页}"""
+    rnd = random.Random(seed)
+    heads = ['1', '2', '3', '4', '5', '6', '7', '8', '9', 'A', 'B', 'C', 'D', 'G', 'H', 'N', 'S', 'Z']
+    station_names = [f"{rnd.choice('南北东西')}{rnd.choice(['沙', '湾', '涌', '岗', '围', '洲'])}站点{i}"
+                     for i in range(max(20, n_routes))]
+    station_ids = {name: i for i, name in enumerate(station_names)}
+    times = ['6:00--22:00', '6:30--21:30|6:00--22:00', '5:50--23:10', '工作日 7:00--19:00',
+             '发车时间：6:00-22:30', '南沙客运站 6:20--21:40|蕉门 6:40--22:00', '到站立刻返程 7:00--18:00']
+    pages = {}
+    lists = {head: [] for head in heads}
+    for n in range(n_routes):
+        href = f"/x_{n:05x}"
+        head = heads[n % len(heads)]
+        lists[head].append(f'<a href="{href}" title="南沙{n}路">南沙{n}路</a>')
+        if n % 7 == 0:
+            # 同一线路出现在多个分类中
+            lists[heads[(n + 1) % len(heads)]].append(f'<a href="{href}" title="南沙{n}路">南沙{n}路</a>')
+        stations = rnd.sample(station_names, rnd.randint(8, 35))
+        directions = [stations, stations[::-1]] if n % 5 else [stations]
+        body = ''
+        for stops in directions:
+            body += (f'<div class="bus-excerpt mb15"><div class="trip">{stops[0]}—{stops[-1]}</div>'
+                     f'<div class="other">全程{len(stops)}站</div></div>'
+                     '<div class="bus-lzlist mb15"><ol>'
+                     + ''.join(f'<li><a href="/z_{station_ids[s]}" aria-label="{s}">{s}</a></li>'
+                               for s in stops)
+                     + '</ol></div>')
+        info = (f'<div class="info"><h1 class="title">南沙{n}路公交车路线<a class="category">[市区普线]</a></h1>'
+                f'<ul class="bus-desc"><li>运行时间：{rnd.choice(times)}</li><li>参考票价：2元</li>'
+                f'<li><a href="/g_1">公交公司：</a><a>广州市第{n % 4 + 1}巴士有限公司</a></li>'
+                f'<li>最后更新：2025-03-01</li></ul></div>')
+        pages[href] = (f'<!DOCTYPE html><html><head><title>南沙{n}路</title><script>var a=1;</script></head>'
+                       f'<body><div class="layout">{info}{body}</div></body></html>')
+    for head, links in lists.items():
+        pages[f"/list{head}"] = (f'<html><body><div class="list clearfix">{"".join(links)}</div>'
+                                 f'<div class="other"><a href="/">首页</a></div></body></html>')
+    pages['/'] = ('<html><body><div class="bus-layer"><div class="pl10">'
+                  + ''.join(f'<a href="/list{head}">{head}</a>' for head in heads)
+                  + '</div></div></body></html>')
+    return pages
+
+
+def synthetic_stations_data(n, seed=0):
+    """模拟百度地点检索中的公交站、地铁站"""
+    rnd = random.Random(seed + 1)
+    stations = []
+    for i in range(n):
+        query = '地铁站' if i % 6 == 0 else '公交车站'
+        lines = rnd.sample([f'南沙{k}路' for k in range(60)], rnd.randint(1, 5))
+        if query == '地铁站':
+            lines = rnd.sample(['地铁4号线', '地铁18号线', '地铁22号线'], 1)
+        stations.append({
+            'query': query,
+            'name': f"{'地铁' if query == '地铁站' else ''}模拟站{i}",
+            'location': {'lat': round(CENTER_LAT + rnd.gauss(0, SPAN / 6), 6),
+                         'lng': round(CENTER_LNG + rnd.gauss(0, SPAN / 6), 6)},
+            'address': ';'.join(lines),
+            'province': '广东省', 'city': '广州市', 'area': '南沙区',
+            'street_id': f's{i}', 'detail': 1, 'uid': f'{i:024x}'
+        })
+    return stations
+
+
+def synthetic_pois_data(n, seed=0):
+    """模拟高德 POI：若干个聚集区加少量分散点，使四叉树需要多级细分"""
+    rnd = random.Random(seed + 2)
+    clusters = [(CENTER_LNG + rnd.uniform(-SPAN, SPAN) * 0.6, CENTER_LAT + rnd.uniform(-SPAN, SPAN) * 0.6,
+                 rnd.uniform(0.003, 0.03)) for _ in range(8)]
+    pois = []
+    for i in range(n):
+        if i % 5 == 0:
+            x, y = CENTER_LNG + rnd.uniform(-SPAN, SPAN), CENTER_LAT + rnd.uniform(-SPAN, SPAN)
+        else:
+            cx, cy, r = rnd.choice(clusters)
+            x, y = cx + rnd.gauss(0, r), cy + rnd.gauss(0, r)
+        x, y = round(x, 6), round(y, 6)
+        pois.append({
+            '_xy': (x, y),
+            'id': f'B0{i:08X}', 'name': f'模拟POI{i}', 'location': f'{x:.6f},{y:.6f}',
+            'type': '餐饮服务;中餐厅;中餐厅', 'typecode': '050100',
+            'pname': '广东省', 'cityname': '广州市', 'adname': '南沙区', 'address': f'模拟路{i % 97}号',
+            'pcode': '440000', 'adcode': '440115', 'citycode': '020',
+            'business': {'opentime_week': '周一至周日 09:00-21:00', 'tel': '020-00000000',
+                         'business_area': '明珠湾', 'rating': '4.5', 'cost': '50.00'},
+        })
+    return pois
+
+
+def distance(lng1, lat1, lng2, lat2):
+    """两点间的近似距离（米）"""
+    dx = (lng2 - lng1) * 111320 * math.cos(math.radians((lat1 + lat2) / 2))
+    dy = (lat2 - lat1) * 110540
+    return math.hypot(dx, dy)
+
+
+def in_polygon(point, polygon):
+    """射线法判断点是否在多边形内（边界上的点视为在内）"""
+    x, y = point
+    xs = [p[0] for p in polygon]
+    ys = [p[1] for p in polygon]
+    if not (min(xs) <= x <= max(xs) and min(ys) <= y <= max(ys)):
+        return False
+    if len(polygon) == 4 and xs[0] == xs[3] and xs[1] == xs[2] and ys[0] == ys[1] and ys[2] == ys[3]:
+        return True  # 矩形
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        (xi, yi), (xj, yj) = polygon[i], polygon[j]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8684
+    cache_dir = sys.argv[2] if len(sys.argv) > 2 else None
+    server = ReplayServer(port=port, page_cache_dir=cache_dir)
+    print(f"回放服务已启动：{server.base_url}")
+    print(f"  8684：Guangzhou8684.BASE_URL = '{server.bus8684_url}'")
+    print(f"  百度：BAIDU_API={server.baidu_url}")
+    print(f"  高德：AMAP_API={server.amap_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,94 @@
+"""
+按站点统计公交服务时间：每个站点的最早首班车、最晚末班车、经停线路数和一天中有公交服务的时长。
+在 txtToxlxs.normalize_tables 的线路站点表上按站点分组计算，全部为 pandas / NumPy 的整列运算，
+不需要逐行拆分“途经站点”。
+
+说明：8684 只提供线路在始发站的首末班时间，这里把线路的首末班时间作为其途经各站的服务时间；
+末班车早于首班车且在 OVERNIGHT_CUTOFF 之前的线路（夜班线等）视为运营到次日；运行时间无法解析
+（txtToxlxs.DEFAULT_TIME）或首末班车顺序不合理的线路只计入经停线路数，不参与服务时间的统计。
+"""
+import pandas as pd
+
+from txtToxlxs import DEFAULT_TIME, load_bus_records, normalize_tables, parse_bus_data
+
+# 末班车早于首班车时，末班车在此时间（小时）之前视为次日，否则视为运行时间有误
+OVERNIGHT_CUTOFF = 6
+
+SPAN_COLUMNS = ["station_id", "站点名称", "经停线路数", "最早首班车", "最晚末班车",
+                "最早首班车（小数制）", "最晚末班车（小数制）", "服务时长（小时）"]
+
+
+def decimal_to_time(hours):
+    """把小数制的时间转换为“HH:MM”，24 点以后的时间记为“次日HH:MM”，空值保持为空"""
+    minutes = (hours * 60).round()
+    valid = minutes.notna()
+    minutes = minutes[valid].astype(int)
+    text = ((minutes // 60 % 24).astype(str).str.zfill(2) + ':' + (minutes % 60).astype(str).str.zfill(2))
+    text = text.where(minutes < 24 * 60, '次日' + text)
+    return text.reindex(hours.index)
+
+
+def service_intervals(routes):
+    """各线路方向的服务时段 [开始, 结束]（小时），运营到次日时结束时间加 24，无法确定时为空"""
+    start = routes["首班车（小数制）"].astype(float)
+    end = routes["末班车（小数制）"].astype(float)
+    overnight = end < start
+    unknown = ((routes["始发站"] == DEFAULT_TIME[0]) & (routes["首班车"] == DEFAULT_TIME[1])
+               & (routes["末班车"] == DEFAULT_TIME[2])) | (overnight & (end > OVERNIGHT_CUTOFF))
+    end = end.where(~overnight, end + 24)
+    return start.mask(unknown), end.mask(unknown)
+
+
+def covered_hours(station, start, end):
+    """
+    每个站点各服务时段的并集长度：按站点、开始时间排序后，开始时间晚于此前各时段最晚结束时间的时段
+    另起一段，各段长度之和即为服务时长（超过 24 小时按 24 小时计）
+    """
+    df = pd.DataFrame({"station": station, "start": start, "end": end}).dropna()
+    df = df.sort_values(["station", "start"], kind="stable")
+    reach = df.groupby("station")["end"].cummax()
+    prev_reach = reach.groupby(df["station"]).shift()
+    segment = (prev_reach.isna() | (df["start"] > prev_reach)).cumsum()
+    segments = df.groupby(segment).agg(station=("station", "first"), start=("start", "min"), end=("end", "max"))
+    return (segments["end"] - segments["start"]).groupby(segments["station"]).sum().clip(upper=24)
+
+
+def station_service_spans(tables):
+    """tables 为 txtToxlxs.normalize_tables 的返回值，返回每个站点一行的服务时间统计"""
+    stations, routes, route_stops = tables['站点表'], tables['线路方向表'], tables['线路站点表']
+    start, end = service_intervals(routes)
+    routes = routes[["route_id", "direction"]].assign(start=start.values, end=end.values)
+
+    # 线路站点表中同一线路方向可能多次经过同一站点（环线首末站），只计一次
+    stops = route_stops[["route_id", "direction", "station_id"]].drop_duplicates()
+    stops = stops.merge(routes, on=["route_id", "direction"], how="left")
+    by_station = stops.groupby("station_id")
+    spans = pd.DataFrame({
+        "经停线路数": by_station["route_id"].nunique(),
+        "最早首班车（小数制）": by_station["start"].min(),
+        "最晚末班车（小数制）": by_station["end"].max(),
+        "服务时长（小时）": covered_hours(stops["station_id"].to_numpy(), stops["start"].to_numpy(),
+                                   stops["end"].to_numpy()),
+    })
+
+    spans = stations.set_index("station_id").join(spans, how="left")
+    spans["经停线路数"] = spans["经停线路数"].fillna(0).astype(int)
+    spans["服务时长（小时）"] = spans["服务时长（小时）"].fillna(0.0).round(2)
+    spans["最早首班车"] = decimal_to_time(spans["最早首班车（小数制）"])
+    spans["最晚末班车"] = decimal_to_time(spans["最晚末班车（小数制）"])
+    return spans.reset_index()[SPAN_COLUMNS]
+
+
+if __name__ == "__main__":
+    # Guangzhou8684.py 输出的 bus.jsonl（推荐）或 bus.txt
+    input_file = "bus.jsonl"
+    output_file = "站点服务时间.xlsx"
+
+    if input_file.endswith('.jsonl'):
+        forward_df, reverse_df = load_bus_records(input_file)
+    else:
+        forward_df, reverse_df = parse_bus_data(input_file)
+    spans = station_service_spans(normalize_tables(forward_df, reverse_df))
+    spans.to_excel(output_file, index=False)
+    print(f"共 {len(spans)} 个站点，结果已保存至 {output_file}")
+    print(spans.sort_values("服务时长（小时）", ascending=False).head(10).to_string(index=False))
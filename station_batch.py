@@ -0,0 +1,37 @@
+# encoding:utf-8
+"""
+多个检索中心批量获取公交站、地铁站（如覆盖整个明珠湾），代替多次运行 Busget 1.0.py / Metroget 1.0.py 再手工合并：
+- 检索中心从文件读取（每行“经度,纬度”或“经度,纬度,半径”，BD09 坐标），或按矩形范围自动生成网格；
+- 各中心并发检索，相邻圆重叠部分的站点按 uid 去重，线路名称去重；
+- 合并后只输出一份 bus_poi.* / metro_poi.*，所有线路只调用一次 getbusdata（已缓存的线路不再获取）。
+"""
+import baidu_station
+
+if __name__ == '__main__':
+    # 检索中心文件；为 None 时按 grid_bounds 生成网格
+    centres_file = "centres.txt"
+    # 网格范围 (南, 西, 北, 东)（BD09 纬度、经度），例如明珠湾一带
+    grid_bounds = (22.69, 113.52, 22.76, 113.62)
+    radius = 1000  # 半径（米），文件中未写半径的中心也使用该值
+    page_max = 10  # 每个中心的最大页面（每页 20 条）
+    targets = {"公交车站": "bus_poi", "地铁站": "metro_poi"}
+
+    keys = input("请输入百度key（多个key用英文逗号分隔）：")
+    searcher = baidu_station.PlaceSearch(keys)
+    if centres_file:
+        centres = baidu_station.read_centres(centres_file, radius)
+    else:
+        centres = baidu_station.grid_centres(grid_bounds, radius)
+    print(f"共 {len(centres)} 个检索中心")
+
+    found = searcher.search_centres(list(targets), centres, page_max)
+    all_lines = []
+    for query, prefix in targets.items():
+        baidu_station.save_results(found[query], prefix)
+        lines = baidu_station.unique_lines(found[query])
+        all_lines += lines
+        print(f'{len(centres)} 个检索范围内共有 {len(found[query])} 个{query}（已去重）和 {len(lines)} 条线路')
+    print(f"共请求 {searcher.calls} 次" + (f"，细分检索 {searcher.cells} 个范围" if searcher.cells else ''))
+
+    city = input('请确认项目所在的城市：')
+    baidu_station.save_lines(city, list(dict.fromkeys(all_lines)))
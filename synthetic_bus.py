@@ -0,0 +1,117 @@
+"""
+生成与 Guangzhou8684.py 输出格式完全相同的模拟 bus.txt（以及对应的 bus.jsonl），用于测试 txtToxlxs.py 的性能：
+- 线路名称、线路类别、票价、运营公司各不相同；
+- 运行时间覆盖 txtToxlxs.process_time 的各种写法（首班--末班、分方向、发车时间、星期/节假日、
+  到站立刻返程、增加停靠、无法解析等）；
+- 大部分线路有正反两个方向（反向站点与正向不完全相同），约五分之一为单方向线路（环线等）。
+同样的线路数和随机种子生成的文件完全相同。
+
+    python synthetic_bus.py 线路数 [输出文件，默认 bus.txt] [随机种子，默认 0]
+"""
+import json
+import random
+import sys
+from pathlib import Path
+
+from Guangzhou8684 import build_route_record, format_route_block
+
+PREFIXES = ['', '', '', '南沙', '番', '夜', '广', 'B', '旅游']
+CATEGORIES = ['市区普线', '市区普线', '市区普线', '郊区线路', '快速公交', '夜班线路', '高峰快线']
+FARES = ['2元', '2元', '1元', '3元', '分段计价，最高5元', '2元（空调车）']
+COMPANIES = [f"广州市第{i}巴士有限公司" for i in range(1, 8)] + ['广州市番禺区公共汽车有限公司', '广州南沙公交有限公司']
+SYLLABLES = list('金洲蕉门明珠湾横沥黄阁东涌榄核大岗万顷沙灵山塘坑鱼窝头市南北新龙岗沥滘凤凰海滨')
+SUFFIXES = ['', '', '', '站', '总站', '路口', '村', '小学', '市场', '(地铁站)', '公园', '客运站']
+
+
+def station_pool(rnd, n):
+    """生成 n 个互不相同的站名"""
+    names = set()
+    while len(names) < n:
+        names.add(''.join(rnd.sample(SYLLABLES, rnd.randint(2, 4))) + rnd.choice(SUFFIXES))
+    return sorted(names)
+
+
+def clock(rnd, start, end):
+    """在 [start, end) 小时内随机取一个时间，分钟有时不补零（8684 上两种写法都有）"""
+    hour, minute = rnd.randint(start, end - 1), rnd.choice([0, 0, 5, 10, 15, 20, 30, 40, 45, 50])
+    return f"{hour}:{minute:02d}" if rnd.random() < 0.9 else f"{hour}:{minute}"
+
+
+def time_string(rnd, origin, terminal, extra_stop):
+    """按 8684 上常见的写法随机生成运行时间"""
+    first, last = clock(rnd, 5, 8), clock(rnd, 18, 24)
+    back_first, back_last = clock(rnd, 5, 8), clock(rnd, 18, 24)
+    kind = rnd.randrange(10)
+    if kind == 0:
+        return f"{first}--{last}"
+    if kind == 1:
+        return f"{origin} {first}--{last}|{terminal} {back_first}--{back_last}"
+    if kind == 2:
+        return f"{origin}发车时间：{'、'.join(clock(rnd, 6, 20) for _ in range(rnd.randint(2, 6)))}"
+    if kind == 3:
+        return f"{rnd.choice(['工作日', '周一至周五', '节假日前'])} {first}--{last}|{rnd.choice(['节假日', '周六日'])} {back_first}--{back_last}"
+    if kind == 4:
+        return f"{origin} {first}--{last}，到站立刻返程|{terminal} {back_first}--{back_last}"
+    if kind == 5:
+        return f"{origin} {first}--{last}（增加停靠{extra_stop}(临时)）"
+    if kind == 6:
+        return f"{origin}发班时间:{first}-{last}，高峰期间隔10分钟"
+    if kind == 7:
+        return f"{first}-{last}"
+    if kind == 8:
+        return rnd.choice(['暂无', '', '以实际发班为准'])
+    return f"{origin}首班{first}，末班{last}"
+
+
+def synthetic_records(n_routes, seed=0, city='guangzhou'):
+    """依次产出 (线路网址, 解析结果)，解析结果与 Guangzhou8684.parse_route_page 的返回值结构相同"""
+    rnd = random.Random(seed)
+    stations = station_pool(rnd, max(50, n_routes * 3))
+    for n in range(n_routes):
+        name = f"{rnd.choice(PREFIXES)}{n + 1}路"
+        stops = rnd.sample(stations, rnd.randint(6, 45))
+        if rnd.random() < 0.2:
+            # 单方向线路：环线首末站相同
+            if rnd.random() < 0.5:
+                stops.append(stops[0])
+            trips = [(f"{stops[0]}—{stops[-1]}", stops)]
+        else:
+            back = stops[::-1]
+            # 反向途经的站点与正向不完全相同
+            if len(back) > 6 and rnd.random() < 0.5:
+                back.pop(rnd.randint(1, len(back) - 2))
+            if rnd.random() < 0.3:
+                back.insert(rnd.randint(1, len(back) - 1), rnd.choice(stations))
+            trips = [(f"{stops[0]}—{stops[-1]}", stops), (f"{back[0]}—{back[-1]}", back)]
+
+        detail = [f"{name}公交车路线", f"[{rnd.choice(CATEGORIES)}]",
+                  f"运行时间：{time_string(rnd, stops[0], stops[-1], rnd.choice(stations))}",
+                  f"参考票价：{rnd.choice(FARES)}", "公交公司：", rnd.choice(COMPANIES)]
+        record = {'detail': detail, 'company_name': detail[-2] + detail[-1], 'trips': trips}
+        yield f"https://{city}.8684.cn/x_{rnd.getrandbits(32):08x}", record
+
+
+def write_synthetic_bus(output_path, n_routes, seed=0, record_path=None):
+    """写出模拟的 bus.txt；record_path 不为 None 时同时写出结构化记录 bus.jsonl"""
+    records = open(record_path, 'w', encoding='utf-8') if record_path else None
+    try:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for route_url, record in synthetic_records(n_routes, seed):
+                f.write(format_route_block(route_url, record))
+                if records:
+                    records.write(json.dumps(build_route_record(route_url, record), ensure_ascii=False) + '\n')
+    finally:
+        if records:
+            records.close()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    n_routes = int(sys.argv[1])
+    output_path = sys.argv[2] if len(sys.argv) > 2 else 'bus.txt'
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    record_path = Path(output_path).with_suffix('.jsonl')
+    write_synthetic_bus(output_path, n_routes, seed, record_path)
+    print(f"已生成 {n_routes} 条线路：{output_path}、{record_path}")
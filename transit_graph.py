@@ -0,0 +1,177 @@
+"""
+由 txtToxlxs.py 解析出的线路站点建立公交网络，回答换乘问题：
+- 某站点 k 次换乘以内能到达哪些站点；
+- 两个站点之间换乘次数最少的乘车方案（如 蕉门 → 明珠湾）；
+- 若干站点两两之间的最少换乘次数。
+站点和线路方向都用整数编号，线路方向的途经站点、站点的经停线路都以 CSR（压缩稀疏行）数组保存，
+查询按乘车次数逐轮扩展，每轮只处理本轮新到达站点的经停线路，全市网络的查询在毫秒级完成。
+"""
+import numpy as np
+import pandas as pd
+
+from txtToxlxs import load_bus_records, normalize_tables, parse_bus_data
+
+# 未到达的站点的乘车次数
+UNREACHABLE = -1
+DIRECTION_NAMES = {0: '正向', 1: '反向'}
+
+
+def gather(ptr, values, rows, starts=None):
+    """
+    取出 CSR 数组中若干行的全部元素，返回 (元素, 所在行在 rows 中的下标)。
+    starts 不为 None 时从 starts 指定的位置取到行尾，用于只取某个站序之后的站点
+    """
+    begin = ptr[rows] if starts is None else starts
+    lengths = ptr[rows + 1] - begin
+    total = int(lengths.sum())
+    owner = np.repeat(np.arange(len(rows)), lengths)
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return values[np.repeat(begin, lengths) + offsets], owner
+
+
+class TransitGraph:
+    """
+    公交网络：
+    - pattern_ptr / pattern_stations：各线路方向依次经过的站点（CSR，第 p 个线路方向的站点为
+      pattern_stations[pattern_ptr[p]:pattern_ptr[p + 1]]），下文称其中的每个位置为“停靠”；
+    - station_ptr / station_stops：各站点的全部停靠在上述数组中的位置（CSR）；
+    - stop_pattern：每个停靠所属的线路方向。
+    """
+
+    def __init__(self, tables):
+        """tables 为 txtToxlxs.normalize_tables 的返回值"""
+        stations, routes, route_stops = tables['站点表'], tables['线路方向表'], tables['线路站点表']
+        self.station_names = stations['站点名称'].to_numpy()
+        self.station_index = {name: i for i, name in enumerate(self.station_names)}
+        self.pattern_names = routes['线路名称'].to_numpy()
+        self.pattern_directions = routes['direction'].to_numpy()
+
+        patterns = pd.MultiIndex.from_frame(routes[['route_id', 'direction']])
+        route_stops = route_stops.sort_values(['route_id', 'direction', 'seq'], kind='stable')
+        stop_pattern = patterns.get_indexer(pd.MultiIndex.from_frame(route_stops[['route_id', 'direction']]))
+        order = np.argsort(stop_pattern, kind='stable')
+        self.stop_pattern = stop_pattern[order]
+        self.pattern_stations = route_stops['station_id'].to_numpy()[order] - 1
+        self.pattern_ptr = np.concatenate(([0], np.cumsum(np.bincount(self.stop_pattern, minlength=len(patterns)))))
+
+        self.station_stops = np.argsort(self.pattern_stations, kind='stable')
+        self.station_ptr = np.concatenate(
+            ([0], np.cumsum(np.bincount(self.pattern_stations, minlength=len(self.station_names)))))
+
+    @classmethod
+    def from_frames(cls, forward_df, reverse_df):
+        return cls(normalize_tables(forward_df, reverse_df))
+
+    @classmethod
+    def from_file(cls, file_path):
+        """读取 bus.jsonl（推荐，站名完整）或 bus.txt"""
+        if str(file_path).endswith('.jsonl'):
+            return cls.from_frames(*load_bus_records(file_path))
+        return cls.from_frames(*parse_bus_data(file_path))
+
+    def find_stations(self, name):
+        """站名完全相同的站点；没有时返回名称中包含 name 的全部站点（如“蕉门”包括“蕉门总站”“蕉门(地铁站)”）"""
+        if name in self.station_index:
+            return np.array([self.station_index[name]])
+        ids = np.flatnonzero([name in s for s in self.station_names])
+        if len(ids) == 0:
+            raise KeyError(f"没有找到站点：{name}")
+        return ids
+
+    def rides(self, origins, max_rides=None, targets=None):
+        """
+        从 origins（站点编号）出发到各站点的最少乘车次数（换乘次数为乘车次数减 1），未到达为 UNREACHABLE；
+        同时返回每个站点最后一程的上车停靠位置，用于还原乘车方案。
+        targets 为若干组站点编号，每组都有站点到达后即停止扩展（其余站点的结果不完整）
+        """
+        rides = np.full(len(self.station_names), UNREACHABLE, dtype=np.int16)
+        board_stop = np.full(len(self.station_names), -1, dtype=np.int64)
+        frontier = np.unique(np.asarray(origins))
+        rides[frontier] = 0
+        n = 0
+        while len(frontier) and (max_rides is None or n < max_rides):
+            n += 1
+            # 本轮新到达站点的全部停靠；同一线路方向取最靠前的停靠上车
+            stops, _ = gather(self.station_ptr, self.station_stops, frontier)
+            stops = np.sort(stops)
+            patterns, first = np.unique(self.stop_pattern[stops], return_index=True)
+            boards = stops[first]
+            # 上车之后的各站均可到达
+            reached, owner = gather(self.pattern_ptr, np.arange(len(self.pattern_stations)), patterns, boards + 1)
+            stations = self.pattern_stations[reached]
+            new = rides[stations] == UNREACHABLE
+            # 同一站点可由多个线路方向到达时，乘车次数相同，任取其一即可
+            rides[stations[new]] = n
+            board_stop[stations[new]] = boards[owner[new]]
+            frontier = np.flatnonzero(rides == n)
+            if targets is not None and all((rides[ids] != UNREACHABLE).any() for ids in targets):
+                break
+        return rides, board_stop
+
+    def reachable(self, origin, max_transfers):
+        """换乘 max_transfers 次以内可以到达的站点及最少换乘次数"""
+        rides, _ = self.rides(self.find_stations(origin), max_transfers + 1)
+        ids = np.flatnonzero(rides > 0)
+        return pd.DataFrame({'站点名称': self.station_names[ids], '换乘次数': rides[ids] - 1}) \
+            .sort_values(['换乘次数', '站点名称'], ignore_index=True)
+
+    def min_transfer_path(self, origin, destination):
+        """
+        换乘次数最少的乘车方案，每程一行：线路名称、方向、上车站、下车站、乘坐站数；无法到达时返回 None
+        """
+        targets = self.find_stations(destination)
+        rides, board_stop = self.rides(self.find_stations(origin), targets=[targets])
+        target_rides = rides[targets]
+        if (target_rides == UNREACHABLE).all():
+            return None
+        station = targets[np.argmin(np.where(target_rides == UNREACHABLE, np.iinfo(np.int16).max, target_rides))]
+
+        legs = []
+        while rides[station] > 0:
+            board = board_stop[station]
+            pattern = self.stop_pattern[board]
+            board_station = self.pattern_stations[board]
+            stops = self.pattern_stations[board:self.pattern_ptr[pattern + 1]]
+            legs.append({
+                '线路名称': self.pattern_names[pattern],
+                '方向': DIRECTION_NAMES.get(self.pattern_directions[pattern], self.pattern_directions[pattern]),
+                '上车站': self.station_names[board_station],
+                '下车站': self.station_names[station],
+                '乘坐站数': int(np.argmax(stops == station)),
+            })
+            station = board_station
+        return pd.DataFrame(legs[::-1], columns=['线路名称', '方向', '上车站', '下车站', '乘坐站数'])
+
+    def transfer_matrix(self, names):
+        """names 中各站点两两之间的最少换乘次数（行为出发站，列为到达站），无法到达为 NaN"""
+        targets = [self.find_stations(name) for name in names]
+        matrix = np.full((len(names), len(names)), np.nan)
+        for i, name in enumerate(names):
+            rides, _ = self.rides(self.find_stations(name), targets=targets)
+            for j, ids in enumerate(targets):
+                reached = rides[ids][rides[ids] != UNREACHABLE]
+                if len(reached):
+                    matrix[i, j] = max(int(reached.min()) - 1, 0)
+        return pd.DataFrame(matrix, index=names, columns=names)
+
+
+if __name__ == "__main__":
+    # Guangzhou8684.py 输出的 bus.jsonl（推荐）或 bus.txt
+    input_file = "bus.jsonl"
+    origin, destination = "蕉门", "明珠湾"
+    max_transfers = 1
+    matrix_stations = ["蕉门", "明珠湾", "金洲", "南沙客运港", "黄阁"]
+
+    graph = TransitGraph.from_file(input_file)
+    print(f"共 {len(graph.station_names)} 个站点、{len(graph.pattern_names)} 个线路方向")
+
+    path = graph.min_transfer_path(origin, destination)
+    if path is None:
+        print(f"{origin} 无法到达 {destination}")
+    else:
+        print(f"{origin} → {destination}：最少换乘 {len(path) - 1} 次")
+        print(path.to_string(index=False))
+
+    reachable = graph.reachable(origin, max_transfers)
+    print(f"{origin} 换乘 {max_transfers} 次以内可到达 {len(reachable)} 个站点")
+    print(graph.transfer_matrix(matrix_stations))
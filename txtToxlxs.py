@@ -1,6 +1,11 @@
 import re
+import json
+import itertools
+import collections
+import multiprocessing
 import pandas as pd
 from pathlib import Path
+from functools import lru_cache
 import sys
 
 def install_package(package):
@@ -31,12 +36,74 @@ def extract_route_name(line):
             return match.group(1).strip()
     return line.strip()
 
+# ------------------- 运行时间解析规则 -------------------
+TIME_PATTERN = re.compile(r'(\d{1,2}:\d{1,2})')
+DASH_PATTERN = re.compile(r'(\d{1,2}:\d{1,2})\s*--\s*(\d{1,2}:\d{1,2})')
+FB_PATTERN = re.compile(r"(发班时间|发车时间)")
+COLON_PATTERN = re.compile(r'[：:]')
+PAREN_PATTERN = re.compile(r'\([^)]*\)')
+
+WEEKDAY_KEYWORDS = [
+    "工作日", "工作日、周六", "节假日", "周一至周五", "周六日", "周六、日、节假日", "周五或节假日前一天",
+    "每周二、周四", "上学日周日或法定节假日最后一日", "上学日周五或法定节假日前一日",
+    "节假日前", "节假日后"
+]
+
+# 无法解析时的默认值
+DEFAULT_TIME = ("未知站点", "06:00", "22:30")
+# 缓存的运行时间字符串数，相同的运行时间只解析一次
+TIME_CACHE_SIZE = 4096
+
 def extract_times(s: str):
     """
     从字符串中提取所有符合 \d{1,2}:\d{1,2} 的时间，返回原始顺序的列表。
     """
-    raw_times = re.findall(r'(\d{1,2}:\d{1,2})', s)
-    return raw_times  # 直接返回原始顺序
+    return TIME_PATTERN.findall(s)  # 直接返回原始顺序
+
+def _first_last(time_str, match):
+    """始发站为第一个时间之前的文字，首末班车为第一个和最后一个时间"""
+    times = extract_times(time_str)
+    if times:
+        station_part = time_str.split(times[0])[0].strip()
+        return station_part, times[0], times[-1]
+    return None
+
+def _after_label(time_str, match):
+    """“发班时间/发车时间”之前为始发站，冒号之后为各班次时间"""
+    fb_index = match.start()
+    station = time_str[:fb_index].strip()
+    colon_split = COLON_PATTERN.split(time_str[fb_index:], maxsplit=1)
+    if len(colon_split) >= 2:
+        times = extract_times(colon_split[1].strip())
+        if times:
+            return station, times[0], times[-1]
+    return None
+
+def _dash(time_str, match):
+    """“首班--末班”形式"""
+    station_part = time_str.split(match.group(1))[0].strip()
+    return station_part, match.group(1), match.group(2)
+
+def _contains(*keywords):
+    return lambda time_str: all(k in time_str for k in keywords)
+
+# 预处理规则，依次执行：(匹配条件, 处理方法)
+TIME_PREPROCESS_RULES = [
+    (_contains("到站立刻返程", "|"), lambda time_str: time_str.split('|')[0]),
+    (_contains("增加停靠"), lambda time_str: PAREN_PATTERN.sub('', time_str)),
+]
+
+# 解析规则，按顺序尝试：(规则名称, 匹配条件, 提取方法)。
+# 匹配条件的返回值会传给提取方法；提取方法返回 None 时继续尝试下一条规则，全部失败时返回 DEFAULT_TIME。
+# 新的特殊情况只需在这里增加一条规则
+TIME_RULES = [
+    ("发班时间", FB_PATTERN.search, _after_label),
+    ("星期/节假日", lambda time_str: any(k in time_str for k in WEEKDAY_KEYWORDS), _first_last),
+    ("到站立刻返程", _contains("到站立刻返程"), _first_last),
+    ("增加停靠", _contains("增加停靠"), _first_last),
+    ("首班--末班", DASH_PATTERN.search, _dash),
+    ("其他", lambda time_str: True, _first_last),
+]
 
 def time_to_decimal(time_str):
     """将时间字符串（如'08:30'）转换为小数（如8.5）"""
@@ -48,64 +115,22 @@ def time_to_decimal(time_str):
     except ValueError:
         return None
 
+@lru_cache(maxsize=TIME_CACHE_SIZE)
 def process_time(time_str):
     """
-    结合多条特殊规则解析运行时间字符串，返回(始发站, 首班车, 末班车)。
+    按 TIME_PREPROCESS_RULES、TIME_RULES 解析运行时间字符串，返回(始发站, 首班车, 末班车)。
     """
-    if "到站立刻返程" in time_str and '|' in time_str:
-        time_str = time_str.split('|')[0]
-    if "增加停靠" in time_str:
-        time_str = re.sub(r'\([^)]*\)', '', time_str)
-
-    weekday_keywords = [
-        "工作日", "工作日、周六", "节假日", "周一至周五", "周六日", "周六、日、节假日", "周五或节假日前一天",
-        "每周二、周四", "上学日周日或法定节假日最后一日", "上学日周五或法定节假日前一日",
-        "节假日前", "节假日后"
-    ]
+    for condition, transform in TIME_PREPROCESS_RULES:
+        if condition(time_str):
+            time_str = transform(time_str)
 
-    fb_pattern = r"(发班时间|发车时间)"
-    if re.search(fb_pattern, time_str):
-        match_fb = re.search(fb_pattern, time_str)
-        fb_index = match_fb.start()
-        station = time_str[:fb_index].strip()
-        colon_split = re.split(r'[：:]', time_str[fb_index:], maxsplit=1)
-        if len(colon_split) >= 2:
-            times_part = colon_split[1].strip()
-            times = extract_times(times_part)
-            if times:
-                return station, times[0], times[-1]
-
-    if any(k in time_str for k in weekday_keywords):
-        times = extract_times(time_str)
-        if times:
-            station_part = time_str.split(times[0])[0].strip()
-            return station_part, times[0], times[-1]
-
-    if "到站立刻返程" in time_str:
-        times = extract_times(time_str)
-        if times:
-            station_part = time_str.split(times[0])[0].strip()
-            return station_part, times[0], times[-1]
-
-    if "增加停靠" in time_str:
-        times = extract_times(time_str)
-        if times:
-            station_part = time_str.split(times[0])[0].strip()
-            return station_part, times[0], times[-1]
-
-    dash_match = re.search(r'(\d{1,2}:\d{1,2})\s*--\s*(\d{1,2}:\d{1,2})', time_str)
-    if dash_match:
-        station_part = time_str.split(dash_match.group(1))[0].strip()
-        first_bus = dash_match.group(1)
-        last_bus = dash_match.group(2)
-        return station_part, first_bus, last_bus
-    else:
-        times = extract_times(time_str)
-        if times:
-            station_part = time_str.split(times[0])[0].strip()
-            return station_part, times[0], times[-1]
-        else:
-            return "未知站点", "06:00", "22:30"
+    for name, condition, extract in TIME_RULES:
+        match = condition(time_str)
+        if match:
+            result = extract(time_str, match)
+            if result is not None:
+                return result
+    return DEFAULT_TIME
 
 def parse_stations_from_section(section):
     """
@@ -124,151 +149,416 @@ def parse_stations_from_section(section):
         stations.extend([s.strip() for s in parts if s.strip()])
     return stations
 
-def parse_bus_data(file_path):
-    """综合处理：解析线路名称、时间，并区分正向与反向的站点"""
+def build_rows(line_counter, route_name, company, time_parts, forward_stations, reverse_stations):
+    """生成某条线路正向、反向的表格行，没有站点的方向返回 None"""
+    forward_row = reverse_row = None
+
+    if forward_stations:
+        f_station, f_start, f_end = process_time(time_parts[0] if time_parts else "")
+        forward_row = {
+            "线路编号": line_counter,
+            "线路名称": route_name,
+            "运营公司": company,
+            "始发站": f_station,
+            "首班车": f_start,
+            "末班车": f_end,
+            "途经站点": ",".join(forward_stations),
+            "首班车（小数制）": time_to_decimal(f_start),
+            "末班车（小数制）": time_to_decimal(f_end)
+        }
+
+    if reverse_stations:
+        r_str = time_parts[1] if len(time_parts) > 1 else (time_parts[0] if time_parts else "")
+        r_station, r_start, r_end = process_time(r_str)
+        reverse_row = {
+            "线路编号": line_counter,
+            "线路名称": route_name,
+            "运营公司": company,
+            "始发站": r_station,
+            "首班车": r_start,
+            "末班车": r_end,
+            "途经站点": ",".join(reverse_stations),
+            "首班车（小数制）": time_to_decimal(r_start),
+            "末班车（小数制）": time_to_decimal(r_end)
+        }
+
+    return forward_row, reverse_row
+
+BLOCK_DELIMITER = re.compile(r'=== https://.*? ===')
+
+def iter_bus_blocks(file_path):
+    """
+    逐行读取 bus.txt，按“=== https://... ===”分隔依次产出各线路块的文本，
+    与对整个文件执行 re.split 的结果相同，但不需要一次性读入整个文件
+    """
     if not Path(file_path).exists():
         raise FileNotFoundError(f"文件 {file_path} 不存在")
 
     with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+        block = []
+        for line in f:
+            pieces = BLOCK_DELIMITER.split(line)
+            block.append(pieces[0])
+            for piece in pieces[1:]:
+                yield ''.join(block)
+                block = [piece]
+        yield ''.join(block)
+
+def parse_block(block):
+    """
+    解析一个线路块，返回 (正向行, 反向行)，没有站点的方向为 None，“线路编号”由调用方填写；
+    不是有效线路块时返回 None，解析出错时返回错误信息
+    """
+    block = block.strip()
+    if not block:
+        return None
+
+    lines = [l.strip() for l in block.split('\n') if l.strip()]
+    if len(lines) < 5:
+        return None
+
+    route_name = extract_route_name(lines[0])
+    if not route_name:
+        return None
+
+    try:
+        company = next((line.split("公交公司：")[-1] for line in lines if "公交公司：" in line), "未知公司")
+
+        time_info = next((line.replace('运行时间：', '') for line in lines if line.startswith('运行时间：')), "")
+        time_parts = time_info.split('|')
+
+        header_indices = [i for i, line in enumerate(lines) if ("—" in line) and ("公交" not in line)]
+        if len(header_indices) >= 2:
+            forward_section = lines[header_indices[0] + 1 : header_indices[1]]
+            reverse_section = lines[header_indices[1] + 1 : ]
+            forward_stations = parse_stations_from_section(forward_section)
+            reverse_stations = parse_stations_from_section(reverse_section)
+        else:
+            forward_stations = parse_stations_from_section(lines)
+            reverse_stations = forward_stations[::-1] if len(forward_stations) > 1 else []
+
+        return build_rows(None, route_name, company, time_parts, forward_stations, reverse_stations)
+    except Exception as e:
+        return str(e)
 
+# 多进程解析时每次分给一个进程的线路块数
+PARSE_CHUNKSIZE = 256
+
+def parse_blocks(blocks):
+    """解析一批线路块（多进程解析时每次分给一个进程）"""
+    return [parse_block(block) for block in blocks]
+
+def iter_parsed_blocks(file_path, processes=1, chunksize=PARSE_CHUNKSIZE):
+    """
+    依次产出各线路块的解析结果（parse_block 的返回值）。
+    processes 大于 1 时由多个进程并行解析，结果按原顺序产出，与逐块解析完全相同；
+    同时最多有 processes × 2 批（每批 chunksize 块）在解析或等待取走，读取文件的速度不会超过写入的速度，
+    流式写入时内存占用同样与输入文件大小无关
+    """
+    blocks = iter_bus_blocks(file_path)
+    if processes <= 1:
+        yield from map(parse_block, blocks)
+        return
+    pending = collections.deque()
+    with multiprocessing.Pool(processes) as pool:
+        for batch in iter(lambda: list(itertools.islice(blocks, chunksize)), []):
+            pending.append(pool.apply_async(parse_blocks, (batch,)))
+            if len(pending) >= processes * 2:
+                yield from pending.popleft().get()
+        while pending:
+            yield from pending.popleft().get()
+
+def number_rows(parsed_blocks):
+    """依次为有效的线路块编号，产出 (正向行, 反向行)"""
+    line_counter = 0
+    for parsed in parsed_blocks:
+        if parsed is None:
+            continue
+        line_counter += 1
+        if isinstance(parsed, str):
+            print(f"线路 {line_counter} 解析失败，错误：{parsed}")
+            continue
+        for row in parsed:
+            if row:
+                row["线路编号"] = line_counter
+        yield parsed
+
+def parse_bus_data(file_path, processes=1):
+    """综合处理：解析线路名称、时间，并区分正向与反向的站点；processes 为解析进程数"""
     forward_data = []
     reverse_data = []
-    line_counter = 0
 
-    blocks = re.split(r'=== https://.*? ===', content)
+    for forward_row, reverse_row in number_rows(iter_parsed_blocks(file_path, processes)):
+        if forward_row:
+            forward_data.append(forward_row)
+        if reverse_row:
+            reverse_data.append(reverse_row)
 
-    for block in blocks:
-        block = block.strip()
-        if not block:
-            continue
+    return pd.DataFrame(forward_data), pd.DataFrame(reverse_data)
 
-        try:
-            lines = [l.strip() for l in block.split('\n') if l.strip()]
-            if len(lines) < 5:
-                continue
+def load_bus_records(file_path):
+    """读取 Guangzhou8684.py 输出的结构化记录（bus.jsonl），无需再从文本中反推线路信息"""
+    if not Path(file_path).exists():
+        raise FileNotFoundError(f"文件 {file_path} 不存在")
 
-            route_name = extract_route_name(lines[0])
+    forward_data = []
+    reverse_data = []
+    line_counter = 0
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            route_name = extract_route_name(record['route'])
             if not route_name:
                 continue
             line_counter += 1
 
-            company = next((line.split("公交公司：")[-1] for line in lines if "公交公司：" in line), "未知公司")
-
-            time_info = next((line.replace('运行时间：', '') for line in lines if line.startswith('运行时间：')), "")
-            time_parts = time_info.split('|')
-
-            header_indices = [i for i, line in enumerate(lines) if ("—" in line) and ("公交" not in line)]
-            if len(header_indices) >= 2:
-                forward_section = lines[header_indices[0] + 1 : header_indices[1]]
-                reverse_section = lines[header_indices[1] + 1 : ]
-                forward_stations = parse_stations_from_section(forward_section)
-                reverse_stations = parse_stations_from_section(reverse_section)
+            directions = [d['stations'] for d in record['directions']]
+            forward_stations = directions[0] if directions else []
+            if len(directions) >= 2:
+                reverse_stations = directions[1]
             else:
-                forward_stations = parse_stations_from_section(lines)
                 reverse_stations = forward_stations[::-1] if len(forward_stations) > 1 else []
 
-            if forward_stations:
-                f_station, f_start, f_end = process_time(time_parts[0] if time_parts else "")
-                forward_data.append({
-                    "线路编号": line_counter,
-                    "线路名称": route_name,
-                    "运营公司": company,
-                    "始发站": f_station,
-                    "首班车": f_start,
-                    "末班车": f_end,
-                    "途经站点": ",".join(forward_stations),
-                    "首班车（小数制）": time_to_decimal(f_start),
-                    "末班车（小数制）": time_to_decimal(f_end)
-                })
-
-            if reverse_stations:
-                r_str = time_parts[1] if len(time_parts) > 1 else (time_parts[0] if time_parts else "")
-                r_station, r_start, r_end = process_time(r_str)
-                reverse_data.append({
-                    "线路编号": line_counter,
-                    "线路名称": route_name,
-                    "运营公司": company,
-                    "始发站": r_station,
-                    "首班车": r_start,
-                    "末班车": r_end,
-                    "途经站点": ",".join(reverse_stations),
-                    "首班车（小数制）": time_to_decimal(r_start),
-                    "末班车（小数制）": time_to_decimal(r_end)
-                })
-
-        except Exception as e:
-            print(f"线路 {line_counter} 解析失败，错误：{str(e)}")
-            continue
+            forward_row, reverse_row = build_rows(line_counter, route_name, record['company'] or "未知公司",
+                                                  record['time'].split('|'), forward_stations, reverse_stations)
+            if forward_row:
+                forward_data.append(forward_row)
+            if reverse_row:
+                reverse_data.append(reverse_row)
 
     return pd.DataFrame(forward_data), pd.DataFrame(reverse_data)
 
-def generate_excel(output_path, forward_df, reverse_df):
-    """生成带完整站点信息的Excel文件"""
+COLUMNS = ["线路编号", "线路名称", "运营公司", "始发站", "首班车", "末班车", "首班车（小数制）", "末班车（小数制）", "途经站点"]
+
+def format_sheet(workbook, worksheet):
+    """设置列宽、格式并写入表头"""
+    header_format = workbook.add_format({
+        'bold': True,
+        'text_wrap': True,
+        'align': 'center',
+        'valign': 'vcenter',
+        'bg_color': '#E6E6FA',
+        'border': 1
+    })
+    time_format = workbook.add_format({'num_format': '@'})
+    decimal_format = workbook.add_format({'num_format': '0.00'})
+
+    worksheet.set_column('A:A', 10)
+    worksheet.set_column('B:B', 25)
+    worksheet.set_column('C:C', 20)
+    worksheet.set_column('D:D', 25)
+    worksheet.set_column('E:F', 12, time_format)
+    worksheet.set_column('G:H', 15, decimal_format)
+    worksheet.set_column('I:I', 100)
+    worksheet.freeze_panes(1, 0)
+    for col_num, value in enumerate(COLUMNS):
+        worksheet.write(0, col_num, value, header_format)
+
+def write_sheet_rows(worksheet, df):
+    """从第二行起逐行写入表格数据，空值留空；逐行写入才能用于 constant_memory 模式"""
+    for row_num, values in enumerate(df.reindex(columns=COLUMNS).itertuples(index=False, name=None), 1):
+        worksheet.write_row(row_num, 0, [None if pd.isna(v) else v for v in values])
+
+def generate_excel(output_path, forward_df, reverse_df, constant_memory=False):
+    """
+    生成带完整站点信息的Excel文件。
+    constant_memory 为 True 时使用 xlsxwriter 的 constant_memory 模式逐行写入，适合数十万行的大表
+    （pandas 的 to_excel 按列写入单元格，不能用于该模式）
+    """
     try:
-        with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
-            columns = ["线路编号", "线路名称", "运营公司", "始发站", "首班车", "末班车", "首班车（小数制）", "末班车（小数制）", "途经站点"]
+        if constant_memory:
+            workbook = xlsxwriter.Workbook(output_path, {'constant_memory': True})
+            try:
+                for sheet_name, df in (('正向线路', forward_df), ('反向线路', reverse_df)):
+                    worksheet = workbook.add_worksheet(sheet_name)
+                    format_sheet(workbook, worksheet)
+                    write_sheet_rows(worksheet, df)
+            finally:
+                workbook.close()
+            return
 
+        with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
             forward_df.to_excel(
                 writer,
                 sheet_name='正向线路',
                 index=False,
-                columns=columns
+                columns=COLUMNS
             )
 
             reverse_df.to_excel(
                 writer,
                 sheet_name='反向线路',
                 index=False,
-                columns=columns
+                columns=COLUMNS
             )
 
-            workbook = writer.book
-            header_format = workbook.add_format({
-                'bold': True,
-                'text_wrap': True,
-                'align': 'center',
-                'valign': 'vcenter',
-                'bg_color': '#E6E6FA',
-                'border': 1
-            })
-            time_format = workbook.add_format({'num_format': '@'})
-            decimal_format = workbook.add_format({'num_format': '0.00'})
-
             for sheet_name in writer.sheets:
-                worksheet = writer.sheets[sheet_name]
-                worksheet.set_column('A:A', 10)
-                worksheet.set_column('B:B', 25)
-                worksheet.set_column('C:C', 20)
-                worksheet.set_column('D:D', 25)
-                worksheet.set_column('E:F', 12, time_format)
-                worksheet.set_column('G:H', 15, decimal_format)
-                worksheet.set_column('I:I', 100)
-                worksheet.freeze_panes(1, 0)
-                for col_num, value in enumerate(columns):
-                    worksheet.write(0, col_num, value, header_format)
+                format_sheet(writer.book, writer.sheets[sheet_name])
 
     except Exception as e:
         print(f"文件生成失败：{str(e)}")
         sys.exit(1)
 
+def columnar_paths(output_path, names):
+    """CSV / Parquet 每个文件只能保存一张表，各表分别保存为“文件名_表名”，如“文件名_正向线路.csv”"""
+    output_path = Path(output_path)
+    return [output_path.with_name(f"{output_path.stem}_{name}{output_path.suffix}") for name in names]
+
+def generate_csv(output_path, tables):
+    """生成 CSV 文件（UTF-8 带 BOM，可直接用 Excel 打开），tables 为 {表名: DataFrame}"""
+    paths = columnar_paths(output_path, tables)
+    for path, df in zip(paths, tables.values()):
+        df.to_csv(path, index=False, encoding='utf-8-sig')
+    return paths
+
+def require_pyarrow():
+    """输出 Parquet 文件需要 pyarrow，未安装时抛出 ImportError"""
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("输出 Parquet 文件需要 pyarrow，请手动执行: pip install pyarrow") from None
+
+def generate_parquet(output_path, tables):
+    """生成 Parquet 文件，读取速度最快，适合后续用 pandas 等工具分析，tables 为 {表名: DataFrame}"""
+    require_pyarrow()
+
+    paths = columnar_paths(output_path, tables)
+    for path, df in zip(paths, tables.values()):
+        df.to_parquet(path, index=False)
+    return paths
+
+def write_output(output_path, forward_df, reverse_df, constant_memory=False):
+    """按输出文件的扩展名（.xlsx / .csv / .parquet）选择输出格式，返回生成的文件列表"""
+    suffix = Path(output_path).suffix.lower()
+    tables = {'正向线路': forward_df.reindex(columns=COLUMNS), '反向线路': reverse_df.reindex(columns=COLUMNS)}
+    if suffix == '.csv':
+        return generate_csv(output_path, tables)
+    if suffix == '.parquet':
+        return generate_parquet(output_path, tables)
+    generate_excel(output_path, forward_df, reverse_df, constant_memory)
+    return [Path(output_path)]
+
+# ------------------- 规范化输出 -------------------
+# 线路方向：0 为正向，1 为反向
+DIRECTIONS = {'正向线路': 0, '反向线路': 1}
+ROUTE_COLUMNS = ["route_id", "direction", "线路名称", "运营公司", "始发站", "首班车", "末班车",
+                 "首班车（小数制）", "末班车（小数制）", "站点数"]
+
+def normalize_tables(forward_df, reverse_df):
+    """
+    把逗号连接的“途经站点”拆成规范化的三张表，按站点查询线路时只需按整数编号关联，无需逐格拆分字符串：
+    - 站点表：station_id、站点名称，站名相同的站点只保存一次，编号按首次出现的顺序从 1 开始；
+    - 线路方向表：route_id（即线路编号）、direction 及线路名称、运营公司、首末班车等信息；
+    - 线路站点表：route_id、direction、seq（该方向上的站序，从 1 开始）、station_id。
+    返回 {表名: DataFrame}
+    """
+    routes = []
+    for sheet_name, df in (('正向线路', forward_df), ('反向线路', reverse_df)):
+        df = df.reindex(columns=COLUMNS).rename(columns={"线路编号": "route_id"})
+        routes.append(df.assign(direction=DIRECTIONS[sheet_name]))
+    routes = pd.concat(routes, ignore_index=True).sort_values(["route_id", "direction"], kind="stable")
+
+    stops = routes[["route_id", "direction"]].assign(
+        station=routes["途经站点"].fillna("").astype(str).str.split(",")).explode("station")
+    stops = stops[stops["station"] != ""]
+    station_ids, station_names = pd.factorize(stops["station"])
+    stops = stops.assign(seq=stops.groupby(["route_id", "direction"]).cumcount() + 1,
+                         station_id=station_ids + 1)
+
+    counts = stops.groupby(["route_id", "direction"]).size()
+    routes["站点数"] = counts.reindex(pd.MultiIndex.from_frame(routes[["route_id", "direction"]]), fill_value=0).values
+    return {
+        '站点表': pd.DataFrame({"station_id": range(1, len(station_names) + 1), "站点名称": station_names}),
+        '线路方向表': routes[ROUTE_COLUMNS].reset_index(drop=True),
+        '线路站点表': stops[["route_id", "direction", "seq", "station_id"]].reset_index(drop=True),
+    }
+
+def write_normalized(output_path, forward_df, reverse_df):
+    """按扩展名输出规范化的三张表：.xlsx 为同一文件的三个工作表，.csv / .parquet 为三个文件"""
+    tables = normalize_tables(forward_df, reverse_df)
+    suffix = Path(output_path).suffix.lower()
+    if suffix == '.csv':
+        return generate_csv(output_path, tables)
+    if suffix == '.parquet':
+        return generate_parquet(output_path, tables)
+    try:
+        with pd.ExcelWriter(output_path, engine='xlsxwriter') as writer:
+            for sheet_name, df in tables.items():
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+                writer.sheets[sheet_name].freeze_panes(1, 0)
+    except Exception as e:
+        print(f"文件生成失败：{str(e)}")
+        sys.exit(1)
+    return [Path(output_path)]
+
+def stream_bus_excel(file_path, output_path, processes=1):
+    """
+    流式处理 bus.txt：逐个线路块解析后直接写入 Excel（xlsxwriter 的 constant_memory 模式），
+    内存占用与输入文件大小无关；processes 为解析进程数。返回 (正向线路记录数, 反向线路记录数)
+    """
+    workbook = xlsxwriter.Workbook(output_path, {'constant_memory': True})
+    worksheets = [workbook.add_worksheet('正向线路'), workbook.add_worksheet('反向线路')]
+    for worksheet in worksheets:
+        format_sheet(workbook, worksheet)
+
+    next_rows = [1, 1]
+    try:
+        for parsed in number_rows(iter_parsed_blocks(file_path, processes)):
+            for i, row in enumerate(parsed):
+                if row:
+                    worksheets[i].write_row(next_rows[i], 0, [row[c] for c in COLUMNS])
+                    next_rows[i] += 1
+    finally:
+        workbook.close()
+    return next_rows[0] - 1, next_rows[1] - 1
+
 if __name__ == "__main__":
+    # 输入文件可以是 Guangzhou8684.py 输出的 bus.txt，也可以是结构化记录 bus.jsonl（更快、更准确）
     input_file = "guangzhou_bus_data.txt"
+    # 输出格式由扩展名决定：.xlsx、.csv 或 .parquet（CSV / Parquet 的正向、反向线路分两个文件保存）
     output_file = "广州公交线路详情.xlsx"
+    # 流式处理 bus.txt：边解析边写入，适合数百 MB 的多城市数据，内存占用不随文件大小增长（仅限 .xlsx）
+    stream_mode = False
+    # 解析 bus.txt 的进程数，大文件可设为 CPU 核数；结果与单进程解析相同
+    processes = 1
+    # 使用 xlsxwriter 的 constant_memory 模式写入大表
+    constant_memory = False
+    # 输出规范化的站点表、线路方向表和线路站点表（站点用整数编号），代替每个方向一行的宽表
+    normalized = False
 
     try:
+        # 缺少输出所需的依赖时在解析之前报错
+        if output_file.endswith('.parquet'):
+            require_pyarrow()
         print("正在解析数据...")
-        forward_df, reverse_df = parse_bus_data(input_file)
+        if stream_mode and not normalized and not input_file.endswith('.jsonl') and output_file.endswith('.xlsx'):
+            print("边解析边生成Excel文件...")
+            forward_count, reverse_count = stream_bus_excel(input_file, output_file, processes)
+            output_paths = [output_file]
+            sample = None
+        else:
+            if input_file.endswith('.jsonl'):
+                forward_df, reverse_df = load_bus_records(input_file)
+            else:
+                forward_df, reverse_df = parse_bus_data(input_file, processes)
 
-        print("生成Excel文件中...")
-        generate_excel(output_file, forward_df, reverse_df)
+            print("生成输出文件中...")
+            if normalized:
+                output_paths = write_normalized(output_file, forward_df, reverse_df)
+            else:
+                output_paths = write_output(output_file, forward_df, reverse_df, constant_memory)
+            forward_count, reverse_count = len(forward_df), len(reverse_df)
+            sample = None if forward_df.empty else forward_df.iloc[0]['途经站点']
 
-        print(f"成功生成文件：{output_file}")
+        print(f"成功生成文件：{'、'.join(str(p) for p in output_paths)}")
         print("数据统计：")
-        print(f"正向线路记录数：{len(forward_df)}")
-        print(f"反向线路记录数：{len(reverse_df)}")
-        if not forward_df.empty:
-            print(f"途经站点示例：{forward_df.iloc[0]['途经站点'][:50]}...")
+        print(f"正向线路记录数：{forward_count}")
+        print(f"反向线路记录数：{reverse_count}")
+        if sample:
+            print(f"途经站点示例：{sample[:50]}...")
     except Exception as e:
         print(f"运行出错：{str(e)}")
         print("排查建议：")